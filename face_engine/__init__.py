@@ -0,0 +1,21 @@
+"""Motor de reconhecimento facial compartilhado pelos apps do repositório.
+
+Reúne detecção (SSD), embeddings (OpenFace), busca na galeria, cache,
+galeria persistente, rastreamento e o filtro de movimento, para que cada
+otimização seja feita em um único lugar.
+"""
+from .analytics import analyze_video, analyze_video_chunked, analyze_videos, load_gallery
+from .embedding_cache import EmbeddingCache
+from .gallery import GalleryIndex
+from .gallery_store import GalleryStore
+from .matchers import ExactMatcher, IVFMatcher, QuantizedMatcher, create_matcher
+from .metrics import Metrics, draw_metrics, serve_metrics, start_metrics_logger
+from .motion_gate import MotionGate
+from .multistream import MultiStreamScheduler
+from .pipeline import VideoPipeline
+from .presence import PresenceTracker
+from .recognizer import FaceRecognizer
+from .recorder import AnnotatedVideoWriter, draw_recognized_people
+from .stream import StreamReader
+from .timing import StartupReport
+from .tracking import FaceTracker
@@ -0,0 +1,177 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+import numpy as np
+from .gallery_store import GalleryStore
+from .presence import APPEARANCE_GAP, PresenceTracker, frame_timestamp
+from .recognizer import FaceRecognizer
+from .recorder import AnnotatedVideoWriter, draw_recognized_people
+from .tracking import FaceTracker
+
+# --- Análise de Vídeos sem Interface ---
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def analyze_video(recognizer, video_source, stop_flag=None, gap=APPEARANCE_GAP, start_frame=0, end_frame=None,
+                  record_path=None, events_only=False):
+    """Reconhece as pessoas quadro a quadro e acumula tempo de tela e aparições.
+
+    Retorna {nome: {'screen_time', 'appearances', 'intervals'}} e o número de
+    quadros processados. Os tempos vêm da posição do quadro no vídeo
+    (CAP_PROP_POS_MSEC), e não do relógio, para não depender da velocidade de
+    processamento. start_frame/end_frame limitam a análise a um trecho. Com
+    `record_path` os quadros anotados são gravados (AnnotatedVideoWriter).
+    """
+    cap = cv2.VideoCapture(video_source)
+    if not cap.isOpened():
+        raise IOError(f"Não foi possível abrir a fonte de vídeo '{video_source}'.")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    presence = PresenceTracker(gap, duration=1 / fps)
+    recorder = AnnotatedVideoWriter(record_path, fps, events_only=events_only) if record_path else None
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    frame_index = start_frame
+    try:
+        while (stop_flag is None or not stop_flag.is_set()) and (end_frame is None or frame_index < end_frame):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamp = frame_timestamp(cap, frame_index, fps)
+            recognized_people = recognizer.recognize_face(frame)
+            presence.observe(timestamp, recognized_people)
+            if recorder is not None:
+                recorder.write(draw_recognized_people(frame, recognized_people), recognized_people, timestamp)
+            frame_index += 1
+    finally:
+        cap.release()
+        if recorder is not None:
+            recorder.close()
+            if recorder.dropped_frames:
+                print(f"{record_path}: {recorder.dropped_frames} quadros não gravados (codificador atrasado)", file=sys.stderr)
+    return presence.results(), frame_index - start_frame
+
+
+def load_gallery(recognizer, gallery_dir):
+    """Cadastra cada imagem do diretório usando o nome do arquivo como nome da pessoa."""
+    for file_name in sorted(os.listdir(gallery_dir)):
+        name, extension = os.path.splitext(file_name)
+        if extension.lower() in IMAGE_EXTENSIONS:
+            if not recognizer.add_known_face(name, os.path.join(gallery_dir, file_name)):
+                print(f"Nenhum rosto encontrado em {file_name}", file=sys.stderr)
+
+
+# Cada processo do pool mantém seu próprio FaceRecognizer
+_worker_recognizer = None
+_worker_detect_every = 1
+_worker_record = (None, False)
+
+
+def _init_worker(gallery, detect_every, detection_mode='full', record_dir=None, events_only=False):
+    global _worker_recognizer, _worker_detect_every, _worker_record
+    # Um processo por núcleo: evita que o OpenCV abra várias threads em cada um
+    cv2.setNumThreads(1)
+    _worker_detect_every = detect_every
+    _worker_record = (record_dir, events_only)
+    if isinstance(gallery, str):
+        # Galeria persistente: cada processo lê a galeria do disco em vez de recebê-la pelo pool,
+        # mas monta sua própria cópia dos embeddings (known_faces e o índice do matcher)
+        _worker_recognizer = FaceRecognizer(store=GalleryStore(gallery, readonly=True), detection_mode=detection_mode)
+        return
+    names, embeddings = gallery
+    _worker_recognizer = FaceRecognizer(detection_mode=detection_mode)
+    _worker_recognizer.matcher.add_many(names, embeddings)
+    for name, embedding in zip(names, embeddings):
+        _worker_recognizer.known_faces[name] = {'embedding': embedding, 'appearances': 0, 'screen_time': 0}
+
+
+def _analyze_in_worker(video_path, start_frame=0, end_frame=None):
+    recognizer = _worker_recognizer
+    if _worker_detect_every > 1:
+        # Um rastreador novo por vídeo (ou trecho)
+        recognizer = FaceTracker(_worker_recognizer, _worker_detect_every)
+    record_dir, events_only = _worker_record
+    record_path = None
+    if record_dir:
+        # Um arquivo por vídeo; em trechos, um por trecho (com o quadro inicial no nome)
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        suffix = f"_{start_frame:08d}" if start_frame or end_frame is not None else ""
+        record_path = os.path.join(record_dir, f"{name}{suffix}.mp4")
+    start = time.perf_counter()
+    results, frames = analyze_video(recognizer, video_path, start_frame=start_frame, end_frame=end_frame,
+                                    record_path=record_path, events_only=events_only)
+    return video_path, results, frames, time.perf_counter() - start
+
+
+def _worker_gallery(recognizer):
+    """O que os processos do pool precisam para montar a galeria."""
+    if recognizer.store is not None:
+        return recognizer.store.path
+    names = list(recognizer.known_faces)
+    embeddings = np.array([recognizer.known_faces[name]['embedding'] for name in names], dtype=np.float32)
+    return names, embeddings
+
+
+def split_video(video_path, chunks):
+    """Divide o vídeo em `chunks` trechos (início, fim) de quadros; o último vai até o fim do arquivo."""
+    cap = cv2.VideoCapture(video_path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if frame_count <= 0:
+        # Contagem desconhecida: sem como dividir
+        return [(0, None)]
+    chunks = max(1, min(chunks, frame_count))
+    bounds = [round(i * frame_count / chunks) for i in range(chunks)] + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def analyze_video_chunked(video_path, recognizer, workers=None, chunks=None, detect_every=1, detection_mode='full',
+                          gap=APPEARANCE_GAP, record_dir=None, events_only=False):
+    """Analisa um único vídeo dividido em trechos processados em paralelo.
+
+    Cada trecho começa com um seek (CAP_PROP_POS_FRAMES) e usa os tempos
+    do próprio vídeo, então os intervalos de cada trecho já estão na mesma
+    escala; um PresenceTracker junta os que se tocam na fronteira entre
+    trechos, e o resultado é o mesmo do processamento sequencial (com
+    detect_every=1). Retorna (resultados, quadros processados).
+    """
+    workers = workers or os.cpu_count()
+    ranges = split_video(video_path, chunks or workers)
+    presence = PresenceTracker(gap)
+    total_frames = 0
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(_worker_gallery(recognizer), detect_every, detection_mode, record_dir, events_only)) as pool:
+        futures = [pool.submit(_analyze_in_worker, video_path, start, end) for start, end in ranges]
+        for future in as_completed(futures):
+            _, results, frames, _ = future.result()
+            presence.merge(results)
+            total_frames += frames
+    return presence.results(), total_frames
+
+
+def analyze_videos(video_paths, recognizer, workers=None, detect_every=1, detection_mode='full', record_dir=None,
+                   events_only=False):
+    """Analisa vários vídeos em paralelo, um processo por worker.
+
+    As redes são carregadas em cada processo. Se `recognizer` usa uma galeria
+    persistente os workers a abrem direto do disco; caso contrário só os
+    embeddings já cadastrados são enviados a eles. Em ambos os casos cada
+    processo guarda sua própria cópia da galeria na memória. Com detect_every > 1
+    o detector só roda a cada detect_every quadros (ver FaceTracker);
+    detection_mode='tiled' acha rostos pequenos em vídeos de alta resolução.
+    Com `record_dir` cada vídeo anotado é gravado lá, com o mesmo nome.
+    """
+    workers = workers or os.cpu_count()
+
+    all_results = {}
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(_worker_gallery(recognizer), detect_every, detection_mode, record_dir, events_only)) as pool:
+        futures = [pool.submit(_analyze_in_worker, path) for path in video_paths]
+        for future in as_completed(futures):
+            video_path, results, frames, elapsed = future.result()
+            all_results[video_path] = results
+            print(f"{video_path}: {frames} quadros em {elapsed:.1f}s ({frames / max(elapsed, 1e-9):.1f} quadros/s)", file=sys.stderr)
+    return all_results
@@ -0,0 +1,103 @@
+import math
+import time
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+# --- Exibição dos Quadros no Tkinter ---
+
+class FrameDisplay:
+    """Mostra quadros BGR em um Label do Tk sem alocar buffers a cada quadro.
+
+    O quadro é reduzido para caber em `max_size` (largura, altura) antes da
+    conversão de cor; a redução e a conversão escrevem em buffers
+    pré-alocados, e a imagem do Pillow aponta para o buffer sem cópia (em
+    RGBA, o formato que o Pillow consegue mapear direto).
+    A mesma PhotoImage é atualizada com paste() enquanto o tamanho não
+    mudar. show() ignora quadros repetidos e não pinta mais que
+    `refresh_hz` vezes por segundo, independente da taxa de inferência: um
+    quadro que chega antes da hora fica pendente (substituído por um mais
+    novo, se vier) e é pintado na próxima chamada, mesmo com frame=None.
+    """
+
+    def __init__(self, label, max_size=None, refresh_hz=60):
+        self.label = label
+        self.max_size = max_size
+        self.refresh_hz = refresh_hz
+        self.shown = 0
+        self.skipped = 0
+        self._resized = None
+        self._rgba = None
+        self._image = None
+        self._photo = None
+        self._last_frame = None
+        self._pending = None
+        self._last_paint = 0.0
+
+    @property
+    def interval_ms(self):
+        """Intervalo sugerido para o after() do laço de exibição (nunca menor que o limite de taxa)."""
+        return max(1, math.ceil(1000 / self.refresh_hz))
+
+    @property
+    def pending(self):
+        """Verdadeiro se há um quadro esperando a próxima pintura."""
+        return self._pending is not None
+
+    def _target_size(self, frame):
+        (h, w) = frame.shape[:2]
+        if self.max_size is None:
+            return w, h
+        # Mantém a proporção e nunca amplia
+        scale = min(1.0, self.max_size[0] / w, self.max_size[1] / h)
+        return max(1, int(w * scale)), max(1, int(h * scale))
+
+    def convert(self, frame):
+        """Reduz e converte o quadro nos buffers reaproveitados; retorna a imagem do Pillow."""
+        size = self._target_size(frame)
+        if self._rgba is None or self._rgba.shape[1::-1] != size:
+            self._resized = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self._rgba = np.empty((size[1], size[0], 4), dtype=np.uint8)
+            # Imagem do Pillow sobre o mesmo buffer (sem cópia)
+            self._image = Image.frombuffer('RGBA', size, self._rgba, 'raw', 'RGBA', 0, 1)
+            self._photo = None
+
+        if size != frame.shape[1::-1]:
+            # INTER_AREA só compensa (e só é rápido) em reduções de 2x ou mais
+            interpolation = cv2.INTER_AREA if size[0] * 2 <= frame.shape[1] else cv2.INTER_LINEAR
+            cv2.resize(frame, size, dst=self._resized, interpolation=interpolation)
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGBA, dst=self._rgba)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=self._rgba)
+        return self._image
+
+    def show(self, frame):
+        """Exibe o quadro (ou o pendente); retorna False se nada foi pintado agora."""
+        now = time.perf_counter()
+        if frame is not None and frame is not self._last_frame:
+            if self._pending is not None:
+                # O pendente nunca será exibido: chegou um mais novo
+                self.skipped += 1
+            self._pending = frame
+        if self._pending is None or now - self._last_paint < 1.0 / self.refresh_hz:
+            return False
+        frame, self._pending = self._pending, None
+        self._last_frame = frame
+        self._last_paint = now
+
+        self.convert(frame)
+        if self._photo is None:
+            self._photo = ImageTk.PhotoImage(image=self._image)
+            self.label.configure(image=self._photo)
+            self.label.imgtk = self._photo
+        else:
+            self._photo.paste(self._image)
+        self.shown += 1
+        return True
+
+    def clear(self):
+        self.label.configure(image='')
+        self.label.imgtk = None
+        self._photo = None
+        self._last_frame = None
+        self._pending = None
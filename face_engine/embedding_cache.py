@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+# --- Cache de Embeddings por Hash Perceptual ---
+
+def face_hash(face_roi):
+    """Hash perceptual (dHash de 64 bits) do recorte: compara pixels vizinhos de uma miniatura 9x8."""
+    gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY) if face_roi.ndim == 3 else face_roi
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+class EmbeddingCache:
+    """Cache LRU de embeddings com expiração (TTL), chaveado pelo recorte do rosto.
+
+    A chave combina a posição/tamanho da caixa, quantizados em passos de
+    `geometry_step` pixels, com o hash perceptual do recorte. Com
+    `hash_tolerance` > 0 um recorte cujo hash difere em até esse número de
+    bits de uma entrada na mesma posição também conta como acerto.
+    """
+
+    def __init__(self, max_size=512, ttl=2.0, hash_tolerance=0, geometry_step=8):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hash_tolerance = hash_tolerance
+        self.geometry_step = geometry_step
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (geometria, hash) -> (embedding, instante)
+        self._by_geometry = {}         # geometria -> {hashes}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, face_roi, box):
+        (startX, startY, endX, endY) = box
+        step = self.geometry_step
+        geometry = (startX // step, startY // step, (endX - startX) // step, (endY - startY) // step)
+        return geometry, face_hash(face_roi)
+
+    def _drop(self, key):
+        del self._entries[key]
+        hashes = self._by_geometry[key[0]]
+        hashes.discard(key[1])
+        if not hashes:
+            del self._by_geometry[key[0]]
+
+    def get(self, key):
+        """Embedding em cache para a chave (ou None), contando acertos e faltas."""
+        now = time.monotonic()
+        with self._lock:
+            found = key if key in self._entries else None
+            if found is None and self.hash_tolerance > 0:
+                geometry, phash = key
+                for other in self._by_geometry.get(geometry, ()):
+                    if bin(phash ^ other).count('1') <= self.hash_tolerance:
+                        found = (geometry, other)
+                        break
+            if found is not None:
+                embedding, stored_at = self._entries[found]
+                if now - stored_at <= self.ttl:
+                    self._entries.move_to_end(found)
+                    self.hits += 1
+                    return embedding
+                self._drop(found)
+            self.misses += 1
+            return None
+
+    def put(self, key, embedding):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (embedding, time.monotonic())
+            self._by_geometry.setdefault(key[0], set()).add(key[1])
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_geometry.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
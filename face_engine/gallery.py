@@ -0,0 +1,133 @@
+import numpy as np
+
+# --- Índice da Galeria de Embeddings ---
+
+class GalleryIndex:
+    """Matriz contígua (float32) com os embeddings conhecidos e os nomes em paralelo.
+
+    Permite inserir e remover pessoas sem reconstruir a matriz inteira e
+    compara todos os rostos de um quadro contra a galeria de uma só vez.
+    """
+
+    def __init__(self, dim=128, capacity=1024):
+        self.dim = dim
+        self._embeddings = np.zeros((capacity, dim), dtype=np.float32)
+        self._sq_norms = np.zeros(capacity, dtype=np.float32)
+        self._names = []
+        self._rows = {}  # nome -> linha na matriz
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    @property
+    def names(self):
+        return np.array(self._names, dtype=object)
+
+    def labels(self, idx):
+        """Nomes correspondentes a uma matriz de índices (mesmo formato)."""
+        idx = np.asarray(idx)
+        labels = np.empty(idx.shape, dtype=object)
+        labels.ravel()[:] = [self._names[i] for i in idx.ravel()]
+        return labels
+
+    @property
+    def embeddings(self):
+        """Visão (sem cópia) das linhas ocupadas da matriz."""
+        return self._embeddings[:len(self._names)]
+
+    def _grow(self):
+        # Dobra a capacidade: custo amortizado constante por inserção
+        capacity = max(1, self._embeddings.shape[0] * 2)
+        embeddings = np.zeros((capacity, self.dim), dtype=np.float32)
+        sq_norms = np.zeros(capacity, dtype=np.float32)
+        n = len(self._names)
+        embeddings[:n] = self._embeddings[:n]
+        sq_norms[:n] = self._sq_norms[:n]
+        self._embeddings, self._sq_norms = embeddings, sq_norms
+
+    def add(self, name, embedding):
+        """Insere (ou substitui) o embedding de uma pessoa."""
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(self.dim)
+        row = self._rows.get(name)
+        if row is None:
+            row = len(self._names)
+            if row == self._embeddings.shape[0]:
+                self._grow()
+            self._names.append(name)
+            self._rows[name] = row
+        self._embeddings[row] = embedding
+        self._sq_norms[row] = np.dot(embedding, embedding)
+
+    def add_many(self, names, embeddings):
+        """Insere várias pessoas de uma vez (cópia única para a matriz)."""
+        names = list(names)
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        if len(set(names)) != len(names) or any(name in self._rows for name in names):
+            # Nomes repetidos precisam da lógica de substituição de add()
+            for name, embedding in zip(names, embeddings):
+                self.add(name, embedding)
+            return
+        start = len(self._names)
+        end = start + len(names)
+        while end > self._embeddings.shape[0]:
+            self._grow()
+        self._embeddings[start:end] = embeddings
+        self._sq_norms[start:end] = np.einsum('ij,ij->i', embeddings, embeddings)
+        for row, name in enumerate(names, start):
+            self._rows[name] = row
+        self._names.extend(names)
+
+    def remove(self, name):
+        """Remove uma pessoa movendo a última linha para o lugar dela."""
+        row = self._rows.pop(name, None)
+        if row is None:
+            return False
+        last = len(self._names) - 1
+        if row != last:
+            moved = self._names[last]
+            self._embeddings[row] = self._embeddings[last]
+            self._sq_norms[row] = self._sq_norms[last]
+            self._names[row] = moved
+            self._rows[moved] = row
+        self._names.pop()
+        return True
+
+    def search(self, queries, k=1):
+        """Retorna (distâncias, índices) dos k vizinhos mais próximos de cada consulta.
+
+        As distâncias são euclidianas, calculadas em lote como
+        ||q||² - 2·q·E + ||e||², e ordenadas da menor para a maior.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        n = len(self._names)
+        if n == 0 or queries.shape[0] == 0:
+            return (np.full((queries.shape[0], 0), np.inf, dtype=np.float32),
+                    np.zeros((queries.shape[0], 0), dtype=np.int64))
+
+        k = min(k, n)
+        d2 = self._sq_norms[:n][None, :] - 2.0 * (queries @ self._embeddings[:n].T)
+        d2 += np.einsum('ij,ij->i', queries, queries)[:, None]
+
+        if k < n:
+            idx = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        else:
+            idx = np.broadcast_to(np.arange(n), d2.shape).copy()
+        part = np.take_along_axis(d2, idx, axis=1)
+        order = np.argsort(part, axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+        dists = np.sqrt(np.maximum(np.take_along_axis(part, order, axis=1), 0.0))
+        return dists, idx
+
+    def match(self, queries, threshold):
+        """Nome mais próximo de cada consulta, ou None se estiver acima do limiar."""
+        dists, idx = self.search(queries, k=1)
+        matches = []
+        for dist, i in zip(dists, idx):
+            if dist.size == 0 or dist[0] > threshold:
+                matches.append((None, float(dist[0]) if dist.size else float('inf')))
+            else:
+                matches.append((self._names[i[0]], float(dist[0])))
+        return matches
@@ -0,0 +1,240 @@
+import json
+import os
+import numpy as np
+
+# --- Galeria Persistente em Disco ---
+
+EMBEDDINGS_FILE = 'embeddings.npy'  # Nome da primeira versão da matriz
+METADATA_FILE = 'metadata.jsonl'
+
+
+class GalleryStore:
+    """Galeria de embeddings salva em disco: matriz .npy mapeada em memória + log de metadados.
+
+    A matriz é pré-alocada e cresce dobrando de tamanho; as linhas ocupadas e
+    os nomes vêm do log `metadata.jsonl`, onde cada linha é um cadastro
+    ({"op": "add", "row", "name"}) ou uma remoção ({"op": "del", "row"}).
+    Cadastros só acrescentam linhas; remoções apenas marcam a linha como
+    apagada (tombstone) até a próxima compactação. Abrir a galeria não lê a
+    matriz: o SO carrega as páginas sob demanda e processos diferentes
+    compartilham a mesma cópia em cache.
+
+    Crescer ou compactar nunca substitui um arquivo que ainda pode estar
+    mapeado (no Windows isso falha): a matriz nova é gravada em outro arquivo
+    (embeddings.N.npy) e o log passa a apontar para ela ({"op": "file"}).
+    Quem já tinha a versão antiga aberta continua lendo a antiga. Quem abre
+    mantém só a versão atual e a anterior (que um leitor pode ter acabado de
+    achar no log); as mais velhas são apagadas. Se mesmo assim o arquivo
+    sumir entre ler o log e abrir a matriz, o log é lido de novo.
+    """
+
+    def __init__(self, path, dim=128, capacity=1024, readonly=False, max_deleted_ratio=0.25):
+        self.path = path
+        self.dim = dim
+        self.readonly = readonly
+        self.max_deleted_ratio = max_deleted_ratio
+        self._names = []       # nome de cada linha (None = apagada)
+        self._rows = {}        # nome -> linha viva
+        self._deleted = 0
+        self._file = EMBEDDINGS_FILE
+
+        metadata_path = os.path.join(path, METADATA_FILE)
+        if os.path.exists(metadata_path):
+            self._matrix = self._open_matrix()
+            self.dim = self._matrix.shape[1]
+            if not readonly:
+                self._remove_old_files()
+        elif readonly:
+            raise FileNotFoundError(metadata_path)
+        else:
+            os.makedirs(path, exist_ok=True)
+            self._matrix = np.lib.format.open_memmap(os.path.join(path, self._file), mode='w+', dtype=np.float32,
+                                                     shape=(capacity, dim))
+            open(metadata_path, 'w').close()
+
+    def _open_matrix(self, attempts=3):
+        """Lê o log e mapeia a matriz que ele indica."""
+        for attempt in range(attempts):
+            self._names, self._rows, self._deleted, self._file = [], {}, 0, EMBEDDINGS_FILE
+            self._replay_log()
+            try:
+                return np.load(os.path.join(self.path, self._file), mmap_mode='r' if self.readonly else 'r+')
+            except FileNotFoundError:
+                # Outro processo trocou de arquivo e apagou este depois da leitura do log
+                if attempt == attempts - 1:
+                    raise
+
+    def _replay_log(self):
+        with open(os.path.join(self.path, METADATA_FILE), encoding='utf-8') as log:
+            for line in log:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry['op'] == 'add':
+                    self._append_row(entry['row'], entry['name'])
+                elif entry['op'] == 'del':
+                    self._delete_row(entry['row'])
+                elif entry['op'] == 'file':
+                    self._file = entry['file']
+
+    @staticmethod
+    def _version(file):
+        """0 para embeddings.npy, N para embeddings.N.npy (None se não for uma matriz)."""
+        stem, extension = os.path.splitext(EMBEDDINGS_FILE)
+        parts = file.split('.')
+        if file == EMBEDDINGS_FILE:
+            return 0
+        if len(parts) == 3 and parts[0] == stem and '.' + parts[2] == extension and parts[1].isdigit():
+            return int(parts[1])
+        return None
+
+    def _next_file(self):
+        stem, _ = os.path.splitext(EMBEDDINGS_FILE)
+        # Versões sempre crescentes: um nome nunca é reaproveitado
+        version = self._version(self._file) + 1
+        while os.path.exists(os.path.join(self.path, f"{stem}.{version}.npy")):
+            version += 1
+        return f"{stem}.{version}.npy"
+
+    def _write_matrix(self, rows, capacity):
+        """Grava `rows` em um arquivo novo com `capacity` linhas; retorna o nome do arquivo."""
+        file = self._next_file()
+        matrix = np.lib.format.open_memmap(os.path.join(self.path, file), mode='w+', dtype=np.float32,
+                                           shape=(capacity, self.dim))
+        matrix[:len(rows)] = rows
+        matrix.flush()
+        del matrix
+        return file
+
+    def _switch_to(self, file):
+        """Passa a usar a nova matriz (já registrada no log) e tenta apagar as versões antigas."""
+        self._file = file
+        self._matrix = np.load(os.path.join(self.path, file), mmap_mode='r+')
+        self._remove_old_files()
+
+    def _remove_old_files(self):
+        """Apaga as versões anteriores à penúltima: a anterior fica até a próxima troca."""
+        current = self._version(self._file)
+        older = []
+        for file in os.listdir(self.path):
+            version = self._version(file)
+            if version is not None and version < current:
+                older.append((version, file))
+        for _, file in sorted(older)[:-1]:
+            try:
+                os.remove(os.path.join(self.path, file))
+            except OSError:
+                # Ainda mapeado por outro processo (Windows): fica para a próxima abertura
+                pass
+
+    def _append_row(self, row, name):
+        # Um nome repetido substitui o cadastro anterior
+        if name in self._rows:
+            self._delete_row(self._rows[name])
+        while len(self._names) <= row:
+            self._names.append(None)
+        self._names[row] = name
+        self._rows[name] = row
+
+    def _delete_row(self, row):
+        name = self._names[row]
+        if name is not None:
+            self._names[row] = None
+            if self._rows.get(name) == row:
+                del self._rows[name]
+            self._deleted += 1
+
+    def _log(self, entries):
+        with open(os.path.join(self.path, METADATA_FILE), 'a', encoding='utf-8') as log:
+            for entry in entries:
+                log.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            log.flush()
+            os.fsync(log.fileno())
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    @property
+    def names(self):
+        return list(self._rows)
+
+    def live(self):
+        """Retorna (nomes, embeddings) das linhas vivas.
+
+        Sem remoções pendentes os embeddings são uma visão direta do mmap.
+        """
+        rows = sorted(self._rows.values())
+        names = [self._names[row] for row in rows]
+        if self._deleted == 0:
+            return names, self._matrix[:len(self._names)]
+        return names, self._matrix[rows]
+
+    def get(self, name):
+        return self._matrix[self._rows[name]]
+
+    def _ensure_capacity(self, size):
+        if size <= self._matrix.shape[0]:
+            return
+        capacity = self._matrix.shape[0]
+        while capacity < size:
+            capacity *= 2
+        file = self._write_matrix(self._matrix[:len(self._names)], capacity)
+        # A troca vale a partir do registro no log
+        self._log([{'op': 'file', 'file': file}])
+        self._switch_to(file)
+
+    def add_many(self, names, embeddings):
+        """Acrescenta embeddings ao fim da matriz e registra os cadastros no log."""
+        if self.readonly:
+            raise PermissionError("Galeria aberta somente para leitura.")
+        names = list(names)
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        start = len(self._names)
+        self._ensure_capacity(start + len(names))
+        # Grava os embeddings antes do log: uma linha só existe depois de registrada
+        self._matrix[start:start + len(names)] = embeddings
+        self._matrix.flush()
+        entries = [{'op': 'add', 'row': row, 'name': name} for row, name in enumerate(names, start)]
+        self._log(entries)
+        for entry in entries:
+            self._append_row(entry['row'], entry['name'])
+
+    def add(self, name, embedding):
+        self.add_many([name], [embedding])
+
+    def delete(self, name):
+        """Marca o cadastro como apagado; compacta se houver linhas apagadas demais."""
+        if self.readonly:
+            raise PermissionError("Galeria aberta somente para leitura.")
+        row = self._rows.get(name)
+        if row is None:
+            return False
+        self._log([{'op': 'del', 'row': row}])
+        self._delete_row(row)
+        if self._deleted > self.max_deleted_ratio * max(1, len(self._names)):
+            self.compact()
+        return True
+
+    def compact(self):
+        """Reescreve a matriz e o log só com as linhas vivas."""
+        if self.readonly:
+            raise PermissionError("Galeria aberta somente para leitura.")
+        names, embeddings = self.live()
+        file = self._write_matrix(embeddings, max(1024, 2 * len(names)))
+        metadata_path = os.path.join(self.path, METADATA_FILE)
+        with open(metadata_path + '.tmp', 'w', encoding='utf-8') as log:
+            log.write(json.dumps({'op': 'file', 'file': file}) + '\n')
+            for row, name in enumerate(names):
+                log.write(json.dumps({'op': 'add', 'row': row, 'name': name}, ensure_ascii=False) + '\n')
+            log.flush()
+            os.fsync(log.fileno())
+
+        # O log não fica mapeado: trocá-lo é o que publica a matriz compactada
+        os.replace(metadata_path + '.tmp', metadata_path)
+        self._switch_to(file)
+        self._names = list(names)
+        self._rows = {name: row for row, name in enumerate(names)}
+        self._deleted = 0
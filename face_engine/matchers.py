@@ -0,0 +1,433 @@
+from functools import partial
+import numpy as np
+from .gallery import GalleryIndex
+
+# --- Backends de Busca na Galeria ---
+
+class Matcher:
+    """Interface comum dos backends usados por FaceRecognizer.recognize_face."""
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def add(self, name, embedding):
+        raise NotImplementedError
+
+    def add_many(self, names, embeddings):
+        for name, embedding in zip(names, embeddings):
+            self.add(name, embedding)
+
+    def remove(self, name):
+        raise NotImplementedError
+
+    def search(self, queries, k=1):
+        """Retorna (distâncias, nomes) dos k vizinhos de cada consulta, ordenados.
+
+        Consultas com menos de k candidatos recebem distância inf e nome None.
+        """
+        raise NotImplementedError
+
+    def match(self, queries, threshold):
+        """Nome mais próximo de cada consulta, ou None se estiver acima do limiar."""
+        dists, names = self.search(queries, k=1)
+        matches = []
+        for dist, name in zip(dists[:, 0], names[:, 0]):
+            if name is None or dist > threshold:
+                matches.append((None, float(dist)))
+            else:
+                matches.append((name, float(dist)))
+        return matches
+
+    def assign(self, queries, threshold, k=5, exclude=()):
+        """Como match, mas cada nome é atribuído a no máximo uma consulta.
+
+        Considera os k vizinhos de cada consulta e atribui os pares de menor
+        distância primeiro (guloso); quem perde o nome para um rosto mais
+        parecido fica com o próximo candidato ou com None. Nomes em `exclude`
+        já estão ocupados por outros rostos do quadro.
+        """
+        dists, names = self.search(queries, k=k)
+        matches = [(None, float(dist)) for dist in dists[:, 0]]
+        # Pares (consulta, candidato) dentro do limiar, do mais próximo ao mais distante
+        rows, cols = np.nonzero(dists <= threshold)
+        order = np.argsort(dists[rows, cols], kind='stable')
+        taken = set(exclude)
+        assigned = set()
+        for q, c in zip(rows[order], cols[order]):
+            name = names[q, c]
+            if q in assigned or name is None or name in taken:
+                continue
+            matches[q] = (name, float(dists[q, c]))
+            assigned.add(q)
+            taken.add(name)
+        return matches
+
+
+def _pad_results(dists, idx, index, k):
+    """Converte índices em nomes e completa as colunas que faltam até k."""
+    n_queries = dists.shape[0]
+    out_dists = np.full((n_queries, k), np.inf, dtype=np.float32)
+    out_names = np.full((n_queries, k), None, dtype=object)
+    found = dists.shape[1]
+    if found:
+        out_dists[:, :found] = dists
+        out_names[:, :found] = index.labels(idx)
+    return out_dists, out_names
+
+
+class ExactMatcher(Matcher):
+    """Busca exata (força bruta vetorizada) sobre um único GalleryIndex."""
+
+    def __init__(self, dim=128):
+        self.dim = dim
+        self.index = GalleryIndex(dim)
+
+    def __len__(self):
+        return len(self.index)
+
+    def add(self, name, embedding):
+        self.index.add(name, embedding)
+
+    def add_many(self, names, embeddings):
+        self.index.add_many(names, embeddings)
+
+    def remove(self, name):
+        return self.index.remove(name)
+
+    def search(self, queries, k=1):
+        dists, idx = self.index.search(queries, k)
+        return _pad_results(dists, idx, self.index, k)
+
+
+def kmeans(data, n_clusters, n_iter=20, seed=0):
+    """K-means simples em NumPy; retorna os centróides (float32)."""
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype=np.float32)
+    centroids = data[rng.choice(len(data), n_clusters, replace=False)].copy()
+    data_sq = np.einsum('ij,ij->i', data, data)
+    for _ in range(n_iter):
+        assign = _nearest(data, centroids, 1, data_sq)[:, 0]
+        order = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        filled = np.nonzero(counts)[0]
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums[filled] = np.add.reduceat(data[order], starts[filled], axis=0)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Clusters vazios são reiniciados em pontos aleatórios
+        if empty.any():
+            centroids[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+    return centroids
+
+
+def _nearest(data, centroids, n, data_sq=None, chunk=65536):
+    """Índices dos n centróides mais próximos de cada linha, processando em blocos."""
+    if data_sq is None:
+        data_sq = np.einsum('ij,ij->i', data, data)
+    centroid_sq = np.einsum('ij,ij->i', centroids, centroids)
+    out = np.empty((len(data), n), dtype=np.int64)
+    for start in range(0, len(data), chunk):
+        block = data[start:start + chunk]
+        d2 = centroid_sq[None, :] - 2.0 * (block @ centroids.T) + data_sq[start:start + chunk, None]
+        if n < centroids.shape[0]:
+            out[start:start + chunk] = np.argpartition(d2, n - 1, axis=1)[:, :n]
+        else:
+            out[start:start + chunk] = np.argsort(d2, axis=1)
+    return out
+
+
+class IVFMatcher(Matcher):
+    """Busca aproximada por arquivo invertido (IVF) com listas exatas.
+
+    Os embeddings são agrupados em n_lists células por k-means e cada
+    consulta só é comparada com as n_probe células mais próximas. Aumentar
+    n_probe melhora o recall às custas de latência; n_lists ≈ √N costuma ser
+    um bom ponto de partida. Até acumular train_size embeddings a busca é exata.
+    """
+
+    def __init__(self, dim=128, n_lists=256, n_probe=8, train_size=None, n_iter=20):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_size = train_size if train_size is not None else 39 * n_lists
+        self.n_iter = n_iter
+        self.centroids = None
+        self._pending = GalleryIndex(dim)
+        self._lists = []
+        self._list_of = {}  # nome -> célula
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def __len__(self):
+        if not self.trained:
+            return len(self._pending)
+        return len(self._list_of)
+
+    def train(self, sample=None):
+        """Treina os centróides e redistribui todos os embeddings já inseridos."""
+        names = list(self._pending.names)
+        embeddings = [self._pending.embeddings]
+        for index in self._lists:
+            names += list(index.names)
+            embeddings.append(index.embeddings)
+        embeddings = np.vstack(embeddings)
+
+        if sample is None:
+            rng = np.random.default_rng(0)
+            size = min(len(embeddings), 64 * self.n_lists)
+            sample = embeddings[rng.choice(len(embeddings), size, replace=False)]
+        n_clusters = min(self.n_lists, len(sample))
+        self.centroids = kmeans(sample, n_clusters, self.n_iter)
+
+        self._pending = GalleryIndex(self.dim)
+        self._lists = [GalleryIndex(self.dim, capacity=16) for _ in range(n_clusters)]
+        self._list_of = {}
+        if names:
+            self._distribute(names, embeddings)
+
+    def _distribute(self, names, embeddings):
+        assign = _nearest(embeddings, self.centroids, 1)[:, 0]
+        order = np.argsort(assign, kind='stable')
+        bounds = np.searchsorted(assign[order], np.arange(len(self._lists) + 1))
+        names = np.asarray(names, dtype=object)
+        for cell in range(len(self._lists)):
+            rows = order[bounds[cell]:bounds[cell + 1]]
+            if len(rows):
+                cell_names = list(names[rows])
+                self._lists[cell].add_many(cell_names, embeddings[rows])
+                self._list_of.update(dict.fromkeys(cell_names, cell))
+
+    def add(self, name, embedding):
+        self.add_many([name], [embedding])
+
+    def add_many(self, names, embeddings):
+        names = list(names)
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        if not self.trained:
+            self._pending.add_many(names, embeddings)
+            if len(self._pending) >= self.train_size:
+                self.train()
+            return
+        # Um nome já cadastrado pode mudar de célula ao ser substituído
+        for name in names:
+            self.remove(name)
+        self._distribute(names, embeddings)
+
+    def remove(self, name):
+        if not self.trained:
+            return self._pending.remove(name)
+        cell = self._list_of.pop(name, None)
+        if cell is None:
+            return False
+        return self._lists[cell].remove(name)
+
+    def search(self, queries, k=1):
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if not self.trained:
+            dists, idx = self._pending.search(queries, k)
+            return _pad_results(dists, idx, self._pending, k)
+
+        n_queries = queries.shape[0]
+        best_dists = np.full((n_queries, k), np.inf, dtype=np.float32)
+        best_names = np.full((n_queries, k), None, dtype=object)
+        n_probe = min(self.n_probe, len(self._lists))
+        probes = _nearest(queries, self.centroids, n_probe)
+
+        # Agrupa as consultas por célula para buscar cada lista uma única vez
+        for cell in np.unique(probes):
+            index = self._lists[cell]
+            if not len(index):
+                continue
+            rows = np.nonzero((probes == cell).any(axis=1))[0]
+            dists, idx = index.search(queries[rows], k)
+            merged_dists = np.concatenate([best_dists[rows], dists], axis=1)
+            merged_names = np.concatenate([best_names[rows], index.labels(idx)], axis=1)
+            order = np.argsort(merged_dists, axis=1, kind='stable')[:, :k]
+            best_dists[rows] = np.take_along_axis(merged_dists, order, axis=1)
+            best_names[rows] = np.take_along_axis(merged_names, order, axis=1)
+        return best_dists, best_names
+
+
+class QuantizedMatcher(Matcher):
+    """Busca exata sobre embeddings normalizados guardados em float16 ou int8.
+
+    Em int8 cada dimensão tem sua própria escala (quantização escalar
+    simétrica), calibrada quando a galeria soma calibration_size embeddings
+    (em um lote ou em vários add); antes disso usa 1/127, que cobre qualquer
+    vetor unitário, e os vetores originais ficam guardados para serem
+    recodificados com a escala certa. A varredura calcula q·x̂ sobre os
+    códigos em blocos de `chunk` linhas, convertidos para float32 em um
+    buffer reaproveitado: o BLAS só multiplica em float, e com blocos que
+    cabem no cache a conversão de int8 custa menos que ler a matriz float32
+    inteira da memória. Já a de float16 é lenta no numpy: nessa precisão a
+    busca fica mais lenta que a ExactMatcher e o ganho é só de memória. Os
+    k·rerank melhores candidatos são reordenados pela distância euclidiana
+    em float. A matriz ocupa 1/4 (int8) ou 1/2 (float16) da versão float32.
+    Consultas e embeddings são normalizados (L2) ao entrar.
+    """
+
+    def __init__(self, dim=128, precision='int8', rerank=4, capacity=1024, calibration_size=256, chunk=4096):
+        if precision not in ('int8', 'float16'):
+            raise ValueError(f"Precisão desconhecida: {precision}")
+        self.dim = dim
+        self.precision = precision
+        self.rerank = rerank
+        self.calibration_size = calibration_size
+        self.chunk = chunk
+        self._dtype = np.int8 if precision == 'int8' else np.float16
+        self._codes = np.zeros((capacity, dim), dtype=self._dtype)
+        self.scales = np.full(dim, 1.0 / 127, dtype=np.float32)
+        self.calibrated = precision != 'int8'
+        self._uncalibrated = {}  # nome -> embedding em float32, até a calibração
+        self._names = []
+        self._rows = {}  # nome -> linha na matriz
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def nbytes(self):
+        """Memória das linhas ocupadas da matriz de códigos."""
+        return len(self._names) * self.dim * self._codes.itemsize
+
+    @staticmethod
+    def _normalize(embeddings):
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def _quantize(self, embeddings):
+        if self.precision == 'float16':
+            return embeddings.astype(np.float16)
+        return np.clip(np.rint(embeddings / self.scales), -127, 127).astype(np.int8)
+
+    def _dequantize(self, codes):
+        codes = codes.astype(np.float32)
+        return codes * self.scales if self.precision == 'int8' else codes
+
+    def calibrate(self, sample):
+        """Escala por dimensão a partir de uma amostra; recodifica o que já foi inserido."""
+        sample = self._normalize(np.asarray(sample, dtype=np.float32).reshape(-1, self.dim))
+        n = len(self._names)
+        stored = self._dequantize(self._codes[:n]) if n and not self._uncalibrated else None
+        # Percentil alto em vez do máximo: um valor extremo não achata a resolução da dimensão
+        self.scales = np.maximum(np.percentile(np.abs(sample), 99.9, axis=0), 1e-6).astype(np.float32) / 127
+        self.calibrated = True
+        if self._uncalibrated:
+            # Inseridos antes da calibração: recodifica a partir dos vetores originais
+            rows = [self._rows[name] for name in self._uncalibrated]
+            self._codes[rows] = self._quantize(np.vstack(list(self._uncalibrated.values())))
+            self._uncalibrated = {}
+        elif stored is not None:
+            self._codes[:n] = self._quantize(stored)
+
+    def _grow(self, needed):
+        capacity = max(1, self._codes.shape[0])
+        while capacity < needed:
+            capacity *= 2
+        codes = np.zeros((capacity, self.dim), dtype=self._dtype)
+        codes[:len(self._names)] = self._codes[:len(self._names)]
+        self._codes = codes
+
+    def add(self, name, embedding):
+        self.add_many([name], [embedding])
+
+    def add_many(self, names, embeddings):
+        names = list(names)
+        embeddings = self._normalize(np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim))
+        if not self.calibrated:
+            if len(self._uncalibrated) + len(embeddings) >= self.calibration_size:
+                sample = np.vstack(list(self._uncalibrated.values()) + [embeddings])
+                rng = np.random.default_rng(0)
+                self.calibrate(sample[rng.choice(len(sample), min(len(sample), 65536), replace=False)])
+            else:
+                self._uncalibrated.update(zip(names, embeddings))
+        codes = self._quantize(embeddings)
+        if len(set(names)) == len(names) and not any(name in self._rows for name in names):
+            # Só nomes novos: cópia única para o fim da matriz
+            start = len(self._names)
+            if start + len(names) > self._codes.shape[0]:
+                self._grow(start + len(names))
+            self._codes[start:start + len(names)] = codes
+            for row, name in enumerate(names, start):
+                self._rows[name] = row
+            self._names.extend(names)
+            return
+        for name, code in zip(names, codes):
+            row = self._rows.get(name)
+            if row is None:
+                row = len(self._names)
+                if row == self._codes.shape[0]:
+                    self._grow(len(names) + row)
+                self._names.append(name)
+                self._rows[name] = row
+            self._codes[row] = code
+
+    def remove(self, name):
+        """Remove uma pessoa movendo a última linha para o lugar dela."""
+        row = self._rows.pop(name, None)
+        if row is None:
+            return False
+        self._uncalibrated.pop(name, None)
+        last = len(self._names) - 1
+        if row != last:
+            moved = self._names[last]
+            self._codes[row] = self._codes[last]
+            self._names[row] = moved
+            self._rows[moved] = row
+        self._names.pop()
+        return True
+
+    def search(self, queries, k=1):
+        queries = self._normalize(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        n_queries = queries.shape[0]
+        n = len(self._names)
+        out_dists = np.full((n_queries, k), np.inf, dtype=np.float32)
+        out_names = np.full((n_queries, k), None, dtype=object)
+        if n == 0 or n_queries == 0:
+            return out_dists, out_names
+
+        # Varredura: maior produto interno com os códigos (escala aplicada à consulta)
+        n_candidates = min(n, k * max(1, self.rerank))
+        scaled = (queries * self.scales).T if self.precision == 'int8' else queries.T
+        best_scores = np.full((n_queries, 0), -np.inf, dtype=np.float32)
+        best_idx = np.zeros((n_queries, 0), dtype=np.int64)
+        decoded = np.empty((min(n, self.chunk), self.dim), dtype=np.float32)
+        for start in range(0, n, self.chunk):
+            block = self._codes[start:min(start + self.chunk, n)]
+            np.copyto(decoded[:len(block)], block)
+            scores = (decoded[:len(block)] @ scaled).T
+            if scores.shape[1] > n_candidates:
+                idx = np.argpartition(-scores, n_candidates - 1, axis=1)[:, :n_candidates]
+            else:
+                idx = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, idx, axis=1)], axis=1)
+            best_idx = np.concatenate([best_idx, idx + start], axis=1)
+            if best_scores.shape[1] > n_candidates:
+                keep = np.argpartition(-best_scores, n_candidates - 1, axis=1)[:, :n_candidates]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_idx = np.take_along_axis(best_idx, keep, axis=1)
+
+        # Reordenação em float pela distância real aos vetores reconstruídos
+        candidates = self._dequantize(self._codes[best_idx])
+        d2 = np.sum((candidates - queries[:, None, :]) ** 2, axis=2)
+        order = np.argsort(d2, axis=1, kind='stable')[:, :k]
+        found = order.shape[1]
+        out_dists[:, :found] = np.sqrt(np.take_along_axis(d2, order, axis=1))
+        idx = np.take_along_axis(best_idx, order, axis=1)
+        labels = np.empty(idx.shape, dtype=object)
+        labels.ravel()[:] = [self._names[i] for i in idx.ravel()]
+        out_names[:, :found] = labels
+        return out_dists, out_names
+
+
+def create_matcher(backend='exact', **options):
+    """Cria o backend de busca pelo nome ('exact', 'ivf', 'float16' ou 'int8')."""
+    backends = {'exact': ExactMatcher, 'ivf': IVFMatcher,
+                'float16': partial(QuantizedMatcher, precision='float16'),
+                'int8': partial(QuantizedMatcher, precision='int8')}
+    if backend not in backends:
+        raise ValueError(f"Backend de busca desconhecido: {backend}")
+    return backends[backend](**options)
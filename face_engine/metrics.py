@@ -0,0 +1,174 @@
+import contextlib
+import json
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import numpy as np
+
+# --- Latência por Etapa ---
+
+_DISABLED = contextlib.nullcontext()
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Latências por etapa (janela móvel), contadores e FPS, compartilhados entre threads.
+
+    `with metrics.stage('detector'): ...` cronometra um bloco; com
+    enabled=False stage() devolve um contexto vazio já criado e nada é
+    medido. snapshot() calcula p50/p95/p99 das últimas `window` medidas de
+    cada etapa; tick() marca um quadro concluído para o FPS.
+    """
+
+    def __init__(self, enabled=True, window=1000, fps_window=2.0):
+        self.enabled = enabled
+        self.window = window
+        self.fps_window = fps_window
+        self._stages = {}  # nome -> deque de segundos
+        self._counters = {}
+        self._ticks = deque()
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _DISABLED
+        return _StageTimer(self, name)
+
+    def record(self, name, seconds):
+        samples = self._stages.get(name)
+        if samples is None:
+            with self._lock:
+                samples = self._stages.setdefault(name, deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def tick(self):
+        """Um quadro concluído (para o FPS)."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            self._ticks.append(now)
+            while self._ticks and now - self._ticks[0] > self.fps_window:
+                self._ticks.popleft()
+
+    def fps(self):
+        with self._lock:
+            if len(self._ticks) < 2:
+                return 0.0
+            return (len(self._ticks) - 1) / max(self._ticks[-1] - self._ticks[0], 1e-9)
+
+    def snapshot(self):
+        """{'fps', 'counters', 'stages': {nome: {'count', 'p50', 'p95', 'p99'}}} em milissegundos."""
+        with self._lock:
+            stages = {name: list(samples) for name, samples in self._stages.items()}
+            counters = dict(self._counters)
+        summary = {}
+        for name, samples in stages.items():
+            if samples:
+                p50, p95, p99 = np.percentile(np.array(samples) * 1000.0, [50, 95, 99])
+                summary[name] = {'count': len(samples), 'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+        return {'fps': self.fps(), 'counters': counters, 'stages': summary}
+
+    def to_json(self):
+        return json.dumps(dict(self.snapshot(), time=time.time()))
+
+    def to_prometheus(self, prefix='face_engine'):
+        """Texto no formato de exposição do Prometheus."""
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {prefix}_fps gauge", f"{prefix}_fps {snapshot['fps']:.3f}"]
+        for name, value in sorted(snapshot['counters'].items()):
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value}"]
+        lines.append(f"# TYPE {prefix}_stage_latency_ms summary")
+        for name, stats in sorted(snapshot['stages'].items()):
+            for quantile in ('p50', 'p95', 'p99'):
+                q = int(quantile[1:]) / 100
+                lines.append(f'{prefix}_stage_latency_ms{{stage="{name}",quantile="{q}"}} {stats[quantile]:.3f}')
+            lines.append(f'{prefix}_stage_latency_ms_count{{stage="{name}"}} {stats["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+def stage(metrics, name):
+    """metrics.stage(name), ou um contexto vazio quando não há métricas."""
+    return _DISABLED if metrics is None else metrics.stage(name)
+
+
+# --- Exportação ---
+
+def start_metrics_logger(metrics, interval=10.0, stream=None, stop_flag=None):
+    """Escreve uma linha JSON com o snapshot a cada `interval` segundos (thread daemon)."""
+    stream = stream or sys.stderr
+    stop_flag = stop_flag or threading.Event()
+
+    def run():
+        while not stop_flag.wait(interval):
+            stream.write(metrics.to_json() + "\n")
+            stream.flush()
+
+    threading.Thread(target=run, name='metrics-logger', daemon=True).start()
+    return stop_flag
+
+
+def serve_metrics(metrics, port=9100, host='127.0.0.1'):
+    """Servidor HTTP local: /metrics (Prometheus) e /metrics.json. Retorna o servidor."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = metrics.to_prometheus(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = metrics.to_json(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+def draw_metrics(frame, metrics, stages=('detector', 'embedder', 'matching', 'recognize')):
+    """Escreve FPS, quadros descartados e p50/p95 das etapas no canto do quadro."""
+    snapshot = metrics.snapshot()
+    lines = [f"FPS {snapshot['fps']:.1f}  descartados {snapshot['counters'].get('dropped_frames', 0)}"]
+    for name in stages:
+        stats = snapshot['stages'].get(name)
+        if stats:
+            lines.append(f"{name} p50 {stats['p50']:.1f} p95 {stats['p95']:.1f} ms")
+    for i, line in enumerate(lines):
+        y = 20 + 18 * i
+        cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3)
+        cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    return frame
@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+
+# --- Filtro de Movimento antes da Inferência ---
+
+class MotionGate:
+    """Pula a detecção quando o quadro não mudou e reaproveita o último resultado.
+
+    Cada quadro é reduzido para `width` pixels de largura, convertido para
+    cinza e suavizado; a diferença absoluta em relação ao último quadro que
+    passou pela inferência é limiarizada em `pixel_threshold`. Se a fração de
+    pixels alterados ficar abaixo de `motion_threshold` a inferência é pulada.
+    Após `max_gated_frames` quadros seguidos pulados (0 = sem limite) a
+    inferência roda mesmo assim, para corrigir mudanças lentas.
+
+    Com `adaptive_tiling=True` o recognizer recebe as regiões com movimento
+    (mais as caixas do último resultado, para não perder rostos parados) e,
+    no modo de detecção 'tiled', só essas regiões são divididas em blocos.
+
+    Tem a mesma interface recognize_face(frame) do recognizer que envolve.
+    """
+
+    def __init__(self, recognizer, motion_threshold=0.002, pixel_threshold=25, width=160, max_gated_frames=0,
+                 adaptive_tiling=False):
+        self.recognizer = recognizer
+        self.motion_threshold = motion_threshold
+        self.pixel_threshold = pixel_threshold
+        self.width = width
+        self.max_gated_frames = max_gated_frames
+        self.adaptive_tiling = adaptive_tiling
+        self.frames = 0
+        self.gated_frames = 0
+        self._reference = None
+        self._last_result = []
+        self._consecutive = 0
+
+    @property
+    def known_faces(self):
+        return self.recognizer.known_faces
+
+    def _thumbnail(self, frame):
+        (h, w) = frame.shape[:2]
+        size = (self.width, max(1, int(h * self.width / w)))
+        gray = cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed_fraction(self, thumbnail):
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            return 1.0
+        diff = cv2.absdiff(thumbnail, self._reference)
+        return np.count_nonzero(diff > self.pixel_threshold) / diff.size
+
+    def motion_regions(self, thumbnail, frame_shape):
+        """Caixas (em pixels do quadro) das áreas que mudaram desde a referência."""
+        mask = (cv2.absdiff(thumbnail, self._reference) > self.pixel_threshold).astype(np.uint8)
+        # Junta pixels alterados próximos em uma única região
+        mask = cv2.dilate(mask, np.ones((5, 5), np.uint8), iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        scale = frame_shape[1] / thumbnail.shape[1]
+        regions = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            regions.append((int(x * scale), int(y * scale), int((x + w) * scale), int((y + h) * scale)))
+        return regions
+
+    def recognize_face(self, frame):
+        self.frames += 1
+        thumbnail = self._thumbnail(frame)
+        idle = self.changed_fraction(thumbnail) < self.motion_threshold
+        if idle and (self.max_gated_frames == 0 or self._consecutive < self.max_gated_frames):
+            self.gated_frames += 1
+            self._consecutive += 1
+            return self._last_result
+
+        self._consecutive = 0
+        if self.adaptive_tiling and self._reference is not None and self._reference.shape == thumbnail.shape:
+            regions = self.motion_regions(thumbnail, frame.shape)
+            regions += [person['box'] for person in self._last_result]
+            self._reference = thumbnail
+            self._last_result = self.recognizer.recognize_face(frame, regions)
+            return self._last_result
+
+        self._reference = thumbnail
+        self._last_result = self.recognizer.recognize_face(frame)
+        return self._last_result
+
+    def reset(self):
+        self._reference = None
+        self._last_result = []
+        self._consecutive = 0
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'gated_frames': self.gated_frames,
+            'gated_fraction': self.gated_frames / self.frames if self.frames else 0.0,
+        }
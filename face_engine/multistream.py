@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+import cv2
+from .metrics import stage
+from .presence import PresenceTracker, frame_timestamp
+
+# --- Várias Câmeras, um Motor de Inferência ---
+
+class _Stream:
+    """Estado de uma câmera: quadro mais novo, prazo do próximo processamento e resultados."""
+
+    def __init__(self, name, capture, fps_target, live=True):
+        self.name = name
+        self.capture = capture
+        self.live = live
+        self.period = 1.0 / fps_target
+        self.next_due = 0.0
+        self.frame = None
+        self.timestamp = 0.0
+        self.seq = -1  # último quadro lido
+        self.taken = -1  # último quadro entregue à inferência
+        self.ended = False
+        self.captured = 0
+        self.processed = 0
+        self.completed = []  # instantes dos últimos resultados (para o FPS)
+        self.latest = None  # (quadro, pessoas reconhecidas)
+        # Nos arquivos o passo entre quadros amostrados nunca é menor que o do próprio vídeo
+        step = self.period if live else max(self.period, 1.0 / (capture.get(cv2.CAP_PROP_FPS) or 30.0))
+        self.presence = PresenceTracker(duration=step)
+
+
+class MultiStreamScheduler:
+    """Reconhecimento em várias câmeras com um único conjunto de redes.
+
+    Cada fonte tem uma thread de leitura que guarda só o quadro mais novo.
+    Os workers de inferência (um por rede do cv2.dnn; `workers` > 1 usa
+    clones do reconhecedor) pegam as câmeras cujo prazo venceu, da mais
+    atrasada para a menos atrasada, e processam até `batch_size` quadros
+    de câmeras diferentes em uma passada só do detector e do modelo de
+    embeddings (recognize_faces). O prazo de cada câmera avança 1/fps a
+    cada quadro processado, então nenhuma recebe mais que o seu
+    `fps_target` (número, ou dicionário por câmera) e nenhuma fica sem
+    vez enquanto outras estão ocupadas.
+
+    Fontes que são arquivos de vídeo não perdem quadros por estarem à
+    frente: a leitura pega um quadro a cada 1/fps do tempo do vídeo e
+    espera ele ser processado antes de ler o próximo, então o arquivo é
+    percorrido na velocidade do `fps_target`, e não na da decodificação.
+
+    Tempo de tela, aparições e intervalos são acumulados separadamente
+    por câmera (PresenceTracker): nas câmeras e URLs com o relógio do
+    momento em que o quadro foi lido, nos arquivos com o tempo do quadro
+    no vídeo (frame_timestamp).
+    """
+
+    def __init__(self, recognizer, sources, fps_target=5.0, batch_size=8, workers=1, stop_flag=None, metrics=None):
+        self.recognizer = recognizer
+        self.batch_size = batch_size
+        self.workers = workers
+        self.stop_flag = stop_flag or threading.Event()
+        self.metrics = metrics
+        self.streams = {}
+        for name, source in sources.items():
+            capture = source if hasattr(source, 'read') else cv2.VideoCapture(source)
+            target = fps_target.get(name, 5.0) if isinstance(fps_target, dict) else fps_target
+            live = not (isinstance(source, str) and os.path.isfile(source))
+            self.streams[name] = _Stream(name, capture, target, live)
+        self._lock = threading.Condition()
+        self._threads = []
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._read_loop, args=(stream,), name=f'capture-{stream.name}', daemon=True)
+                         for stream in self.streams.values()]
+        for i in range(self.workers):
+            recognizer = self.recognizer if i == 0 else self.recognizer.clone()
+            self._threads.append(threading.Thread(target=self._inference_loop, args=(recognizer,), name=f'inference-{i}', daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=1.0):
+        self.stop_flag.set()
+        with self._lock:
+            self._lock.notify_all()
+        self.join(timeout)
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def _read_loop(self, stream):
+        fps = stream.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        index = -1
+        next_sample = 0.0
+        try:
+            while not self.stop_flag.is_set():
+                ret, frame = stream.capture.read()
+                if not ret:
+                    break
+                index += 1
+                if stream.live:
+                    timestamp = time.time()
+                else:
+                    # Arquivo: um quadro a cada período do vídeo (meio quadro de tolerância)
+                    timestamp = frame_timestamp(stream.capture, index, fps)
+                    if timestamp + 0.5 / fps < next_sample:
+                        continue
+                    next_sample += stream.period
+                    if next_sample <= timestamp:
+                        next_sample = timestamp + stream.period
+                with self._lock:
+                    if not stream.live:
+                        # Sem descartar: espera o quadro anterior ir para a inferência
+                        while stream.taken < stream.seq and not self.stop_flag.is_set():
+                            self._lock.wait()
+                    stream.frame = frame
+                    stream.timestamp = timestamp
+                    stream.seq += 1
+                    stream.captured += 1
+                    self._lock.notify_all()
+        finally:
+            stream.capture.release()
+            with self._lock:
+                stream.ended = True
+                self._lock.notify_all()
+
+    def _next_batch(self):
+        """Espera e retira os quadros das câmeras com prazo vencido; lista vazia ao terminar."""
+        with self._lock:
+            while not self.stop_flag.is_set():
+                now = time.monotonic()
+                fresh = [s for s in self.streams.values() if s.seq > s.taken]
+                if not fresh and all(s.ended for s in self.streams.values()):
+                    return []
+                due = sorted((s for s in fresh if s.next_due <= now), key=lambda s: s.next_due)[:self.batch_size]
+                if due:
+                    batch = []
+                    for s in due:
+                        # Sem acumular atraso: uma câmera que ficou parada não ganha uma rajada depois
+                        s.next_due = max(s.next_due + s.period, now)
+                        s.taken = s.seq
+                        batch.append((s, s.frame, s.timestamp))
+                    # Libera a leitura dos arquivos, que espera o quadro ser retirado
+                    self._lock.notify_all()
+                    return batch
+                pending = [s.next_due for s in fresh]
+                self._lock.wait(max(0.001, min(pending) - now) if pending else 0.1)
+        return []
+
+    def _inference_loop(self, recognizer):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                break
+            with stage(self.metrics, 'inference'):
+                recognized = recognizer.recognize_faces([frame for _, frame, _ in batch])
+            if self.metrics is not None:
+                self.metrics.count('processed_frames', len(batch))
+            finished = time.perf_counter()
+            with self._lock:
+                for (stream, frame, timestamp), people in zip(batch, recognized):
+                    stream.processed += 1
+                    stream.completed = stream.completed[-29:] + [finished]
+                    stream.latest = (frame, people)
+                    stream.presence.observe(timestamp, people)
+
+    def latest(self, name):
+        """(quadro, pessoas reconhecidas) mais recente da câmera, ou None."""
+        with self._lock:
+            return self.streams[name].latest
+
+    def results(self):
+        """{câmera: {nome: {'screen_time', 'appearances', 'intervals'}}}."""
+        return {name: stream.presence.results() for name, stream in self.streams.items()}
+
+    def stats(self):
+        """Por câmera: FPS processado, quadros lidos, processados e pulados (substituídos antes da vez).
+
+        Nos arquivos só contam como lidos os quadros amostrados, então nada é pulado.
+        """
+        with self._lock:
+            stats = {}
+            for name, stream in self.streams.items():
+                completed = stream.completed
+                fps = 0.0
+                if len(completed) > 1 and completed[-1] > completed[0]:
+                    fps = (len(completed) - 1) / (completed[-1] - completed[0])
+                stats[name] = {'fps': fps, 'target_fps': 1.0 / stream.period, 'captured': stream.captured,
+                               'processed': stream.processed, 'skipped': stream.captured - stream.processed,
+                               'ended': stream.ended}
+            return stats
@@ -0,0 +1,188 @@
+import collections
+import queue
+import threading
+import time
+import cv2
+from .metrics import stage
+from .presence import frame_timestamp
+
+# --- Pipeline em Estágios: Captura -> Inferência -> Interface ---
+
+_END = object()  # Marca o fim do vídeo nas filas
+
+
+class VideoPipeline:
+    """Executa captura e inferência em threads próprias, ligadas por filas limitadas.
+
+    A thread de captura lê quadros da fonte e os coloca em uma fila de tamanho
+    fixo. Em fontes ao vivo (câmera/URL) o quadro mais antigo é descartado
+    quando a fila enche; em arquivos a captura espera, sem perder quadros.
+    Cada função em `processors` roda em sua própria thread de inferência
+    (uma por rede, pois os modelos do cv2.dnn não são compartilháveis entre
+    threads). A interface só consulta `latest()` e desenha o resultado mais novo;
+    o tempo do quadro correspondente no vídeo (CAP_PROP_POS_MSEC, em segundos)
+    fica em `latest_timestamp`. Com with_timestamps=True os processadores
+    recebem esse tempo também: process_frame(quadro, tempo).
+
+    Com `metrics` são medidas as etapas 'capture' e 'inference', o FPS e os
+    contadores captured_frames e dropped_frames.
+
+    Com vários workers os resultados terminam fora de ordem. `ordered_sink`
+    (ex.: a gravação do vídeo) recebe ordered_sink(tempo, resultado) de
+    cada quadro na ordem da captura: um buffer de reordenação pelo número
+    do quadro segura os que terminaram antes dos anteriores, e os quadros
+    descartados na captura são pulados. É chamado nas threads de
+    inferência, um por vez, então não deve bloquear.
+    """
+
+    def __init__(self, capture, processors, stop_flag, live=False, queue_size=4, metrics=None, with_timestamps=False,
+                 ordered_sink=None):
+        self.capture = capture
+        self.processors = processors
+        self.stop_flag = stop_flag
+        self.live = live
+        self.metrics = metrics
+        self.with_timestamps = with_timestamps
+        self.ordered_sink = ordered_sink
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.results = queue.Queue(maxsize=queue_size * max(1, len(processors)))
+        self.dropped_frames = 0
+        self.captured_frames = 0
+        self.processed_frames = 0
+        self._completed = collections.deque(maxlen=30)  # instantes dos últimos resultados
+        self._latest_seq = -1
+        self.latest_timestamp = None
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pending = {}  # seq -> (tempo, resultado), ou None se descartado
+        self._next_ordered = 0
+        self._order_lock = threading.Lock()
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._capture_loop, daemon=True)]
+        for process_frame in self.processors:
+            self._threads.append(threading.Thread(target=self._inference_loop, args=(process_frame,), daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    @property
+    def finished(self):
+        """Verdadeiro quando todos os estágios terminaram e não há resultados pendentes."""
+        return not self.running and self.results.empty()
+
+    def _put(self, q, item):
+        """Coloca na fila esperando por espaço, mas desiste se stop_flag for acionado."""
+        while not self.stop_flag.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _capture_loop(self):
+        seq = 0
+        fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        try:
+            while not self.stop_flag.is_set():
+                with stage(self.metrics, 'capture'):
+                    ret, frame = self.capture.read()
+                if not ret:
+                    break
+                timestamp = frame_timestamp(self.capture, seq, fps)
+                self.captured_frames += 1
+                if self.metrics is not None:
+                    self.metrics.count('captured_frames')
+                if self.live:
+                    # Fonte ao vivo: mantém só os quadros mais recentes
+                    while True:
+                        try:
+                            self.frames.put_nowait((seq, timestamp, frame))
+                            break
+                        except queue.Full:
+                            try:
+                                discarded = self.frames.get_nowait()
+                                self._deliver(discarded[0], None)
+                                self.dropped_frames += 1
+                                if self.metrics is not None:
+                                    self.metrics.count('dropped_frames')
+                            except queue.Empty:
+                                pass
+                elif not self._put(self.frames, (seq, timestamp, frame)):
+                    break
+                seq += 1
+        finally:
+            self.capture.release()
+            for _ in self.processors:
+                self._put(self.frames, _END)
+
+    def _inference_loop(self, process_frame):
+        while not self.stop_flag.is_set():
+            try:
+                item = self.frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                break
+            seq, timestamp, frame = item
+            with stage(self.metrics, 'inference'):
+                result = process_frame(frame, timestamp) if self.with_timestamps else process_frame(frame)
+            if self.metrics is not None:
+                self.metrics.tick()
+            self._deliver(seq, (timestamp, result))
+            if not self._put(self.results, (seq, timestamp, result)):
+                break
+            with self._lock:
+                self.processed_frames += 1
+                self._completed.append(time.perf_counter())
+
+    def _deliver(self, seq, item):
+        """Entrega ao ordered_sink tudo o que já está em sequência; item None = quadro descartado."""
+        if self.ordered_sink is None:
+            return
+        with self._order_lock:
+            self._pending[seq] = item
+            while self._next_ordered in self._pending:
+                item = self._pending.pop(self._next_ordered)
+                self._next_ordered += 1
+                if item is not None:
+                    self.ordered_sink(*item)
+
+    def latest(self):
+        """Esvazia a fila de resultados e retorna o mais recente ainda não exibido (ou None)."""
+        newest = None
+        while True:
+            try:
+                seq, timestamp, result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            # Com vários workers os resultados podem chegar fora de ordem
+            if seq > self._latest_seq:
+                self._latest_seq = seq
+                self.latest_timestamp = timestamp
+                newest = result
+        return newest
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stats(self):
+        """Quadros por segundo, profundidade das filas e quadros descartados."""
+        with self._lock:
+            completed = list(self._completed)
+        fps = 0.0
+        if len(completed) > 1 and completed[-1] > completed[0]:
+            fps = (len(completed) - 1) / (completed[-1] - completed[0])
+        return {
+            'fps': fps,
+            'frames_queue': self.frames.qsize(),
+            'results_queue': self.results.qsize(),
+            'captured': self.captured_frames,
+            'processed': self.processed_frames,
+            'dropped': self.dropped_frames,
+        }
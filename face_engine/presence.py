@@ -0,0 +1,100 @@
+import threading
+import cv2
+
+# --- Tempo de Tela e Aparições por Intervalos ---
+
+APPEARANCE_GAP = 1.0 # Segundos sem a pessoa para contar uma nova aparição
+UNKNOWN = "Desconhecido"
+
+
+def merge_intervals(intervals, gap=0.0):
+    """Ordena e junta intervalos [início, fim] separados por no máximo `gap` segundos."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start - merged[-1][1] <= gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def frame_timestamp(capture, frame_index, fps):
+    """Tempo (s) do quadro recém-lido: CAP_PROP_POS_MSEC, ou índice / fps se a fonte não informar."""
+    position = capture.get(cv2.CAP_PROP_POS_MSEC)
+    if position > 0 or (position == 0 and frame_index == 0):
+        return position / 1000.0
+    return frame_index / fps
+
+
+class PresenceTracker:
+    """Intervalos de presença de cada pessoa, calculados pelo tempo do vídeo.
+
+    observe(tempo, pessoas) registra que as pessoas estavam no quadro do
+    instante `tempo` (segundos no vídeo, ex.: CAP_PROP_POS_MSEC / 1000),
+    cobrindo `duration` segundos (a duração de um quadro, ou do passo entre
+    quadros processados quando alguns são pulados). Observações separadas
+    por até `gap` segundos fazem parte da mesma aparição, então quadros
+    pulados, descartados ou sem detecção momentânea não criam aparições
+    novas, e o resultado não depende da velocidade de processamento.
+
+    As observações podem chegar fora de ordem (várias threads ou trechos do
+    vídeo processados em paralelo); merge() junta rastreadores de trechos
+    diferentes. results() devolve, por pessoa, os intervalos já unidos, o
+    número de aparições (intervalos) e o tempo de tela (soma dos intervalos).
+    """
+
+    def __init__(self, gap=APPEARANCE_GAP, duration=0.0):
+        self.gap = gap
+        self.duration = duration
+        self._intervals = {}  # nome -> lista de [início, fim]
+        self._lock = threading.Lock()
+
+    def observe(self, timestamp, recognized_people, duration=None):
+        """`recognized_people` é a lista de recognize_face; cada nome conta uma vez por quadro."""
+        end = timestamp + (self.duration if duration is None else duration)
+        names = {person['name'] for person in recognized_people}
+        with self._lock:
+            for name in names:
+                if name == UNKNOWN:
+                    continue
+                intervals = self._intervals.setdefault(name, [])
+                last = intervals[-1] if intervals else None
+                # Caso comum (em ordem): estende o último intervalo sem guardar outro
+                if last is not None and last[0] <= timestamp and timestamp - last[1] <= self.gap:
+                    last[1] = max(last[1], end)
+                else:
+                    intervals.append([timestamp, end])
+
+    def merge(self, other, offset=0.0):
+        """Acrescenta os intervalos de outro trecho, deslocados por `offset` segundos.
+
+        `other` é outro PresenceTracker ou o dicionário de results() (o que um
+        processo do pool consegue devolver).
+        """
+        if isinstance(other, PresenceTracker):
+            other = other.results()
+        incoming = {name: [[start + offset, end + offset] for start, end in data['intervals']]
+                    for name, data in other.items()}
+        with self._lock:
+            for name, intervals in incoming.items():
+                self._intervals.setdefault(name, []).extend(intervals)
+
+    def intervals(self, name):
+        with self._lock:
+            intervals = list(self._intervals.get(name, ()))
+        return merge_intervals(intervals, self.gap)
+
+    def results(self):
+        """{nome: {'screen_time', 'appearances', 'intervals'}}."""
+        with self._lock:
+            names = list(self._intervals)
+        results = {}
+        for name in names:
+            intervals = self.intervals(name)
+            results[name] = {'screen_time': sum(end - start for start, end in intervals),
+                             'appearances': len(intervals), 'intervals': intervals}
+        return results
+
+    def reset(self):
+        with self._lock:
+            self._intervals.clear()
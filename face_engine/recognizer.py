@@ -0,0 +1,387 @@
+import contextlib
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from .matchers import create_matcher
+from .metrics import stage
+
+# --- Configurações dos Modelos ---
+MODEL_DIR = './models/'
+# Modelos para detecção de rostos (SSD)
+PROTOTXT_FILE = 'deploy.prototxt'
+MODEL_FILE = 'res10_300x300_ssd_iter_140000.caffemodel'
+# Modelo para extração de embeddings (OpenFace)
+EMBEDDING_MODEL_FILE = 'nn4.small2.v1.t7'
+# Backend/dispositivo preferidos do cv2.dnn
+DNN_BACKENDS = {'opencv': cv2.dnn.DNN_BACKEND_OPENCV, 'openvino': cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE}
+DNN_TARGETS = {'cpu': cv2.dnn.DNN_TARGET_CPU, 'opencl': cv2.dnn.DNN_TARGET_OPENCL}
+CONFIDENCE_THRESHOLD = 0.5
+RECOGNITION_THRESHOLD = 0.8 # Distância máxima para considerar o rosto conhecido
+# Backend de busca na galeria: 'exact', 'ivf' (aproximado, para galerias muito grandes)
+# ou 'float16'/'int8' (matriz compacta, 2x/4x menos memória)
+MATCHER_BACKEND = 'exact'
+# Número máximo de rostos enviados juntos ao modelo de embeddings
+EMBEDDING_BATCH_SIZE = 32
+# Detecção: 'full' (quadro inteiro em 300x300) ou 'tiled' (quadro inteiro + blocos sobrepostos)
+DETECTION_MODE = 'full'
+TILE_SIZE = 600 # Lado de cada bloco em pixels do quadro original
+TILE_OVERLAP = 0.25 # Fração de sobreposição entre blocos vizinhos
+NMS_THRESHOLD = 0.4 # IoU acima da qual caixas repetidas do detector são descartadas
+# Candidatos da galeria considerados por rosto na atribuição um-para-um
+ASSIGNMENT_CANDIDATES = 5
+
+# --- Classes para a Lógica de Reconhecimento ---
+
+class FaceRecognizer:
+    """Detector SSD + embeddings OpenFace + busca na galeria, compartilhado pelos apps.
+
+    `model_dir` aponta para a pasta com os três arquivos de modelo; `backend`
+    ('opencv' ou 'openvino') e `target` ('cpu' ou 'opencl') escolhem onde o
+    cv2.dnn roda. Com `thread_safe=True` as passadas das redes são protegidas
+    por um lock e a mesma instância pode ser usada por várias threads.
+    `name_key` normaliza os nomes cadastrados (ex.: str.lower).
+
+    Com `detection_mode='tiled'`, quadros maiores que `tile_size` também são
+    divididos em blocos sobrepostos; o quadro inteiro e os blocos passam pelo
+    detector em um único lote e as caixas repetidas são unidas por NMS. Assim
+    rostos distantes em câmeras 4K não somem ao reduzir o quadro para 300x300.
+
+    Com `lazy=True` as redes só são lidas no primeiro uso ou em
+    load_in_background(); o evento `ready` indica quando estão prontas e
+    `load_times` guarda quanto cada parte levou para carregar.
+
+    Com `metrics` (face_engine.metrics.Metrics) cada etapa é cronometrada:
+    resize, blob, detector, nms, embedder_blob, embedder, matching e o
+    recognize_face inteiro ('recognize').
+    """
+
+    def __init__(self, matcher=None, max_batch_size=EMBEDDING_BATCH_SIZE, store=None, cache=None,
+                 model_dir=MODEL_DIR, backend='opencv', target='cpu', thread_safe=False, name_key=None,
+                 detection_mode=DETECTION_MODE, tile_size=TILE_SIZE, tile_overlap=TILE_OVERLAP, lazy=False,
+                 metrics=None):
+        self.model_dir = model_dir
+        self.backend = backend
+        self.target = target
+        self.lazy = lazy
+        self._detector = None
+        self._embedder = None
+        self._load_lock = threading.Lock()
+        self.ready = threading.Event()
+        self.load_times = {}
+        self.metrics = metrics
+        self.thread_safe = thread_safe
+        self._lock = threading.Lock() if thread_safe else contextlib.nullcontext()
+        self.name_key = name_key
+        self.known_faces = {}
+        self.max_batch_size = max_batch_size
+        self.detection_mode = detection_mode
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        # Backend de busca com todos os embeddings conhecidos
+        self.matcher = matcher if matcher is not None else create_matcher(MATCHER_BACKEND)
+        # Cache opcional (EmbeddingCache) para não recalcular rostos parados
+        self.cache = cache
+        # Galeria persistente (GalleryStore) opcional: cadastros sobrevivem ao reinício
+        self.store = store
+        if store is not None and matcher is None:
+            self.load_store()
+        if not lazy:
+            self.load_models()
+
+    def load_models(self):
+        """Lê o detector e o modelo de embeddings, uma única vez mesmo com várias threads."""
+        with self._load_lock:
+            if self._detector is None:
+                start = time.perf_counter()
+                # Carrega o detector de faces
+                self._detector = self._configure(cv2.dnn.readNetFromCaffe(
+                    os.path.join(self.model_dir, PROTOTXT_FILE), os.path.join(self.model_dir, MODEL_FILE)))
+                self.load_times['detector'] = time.perf_counter() - start
+            if self._embedder is None:
+                start = time.perf_counter()
+                # Carrega o modelo de embeddings para reconhecimento
+                self._embedder = self._configure(cv2.dnn.readNetFromTorch(os.path.join(self.model_dir, EMBEDDING_MODEL_FILE)))
+                self.load_times['embedder'] = time.perf_counter() - start
+            self.ready.set()
+
+    def load_in_background(self):
+        """Carrega as redes em uma thread própria; retorna o evento `ready`."""
+        threading.Thread(target=self.load_models, name='model-loader', daemon=True).start()
+        return self.ready
+
+    def _configure(self, net):
+        net.setPreferableBackend(DNN_BACKENDS[self.backend])
+        net.setPreferableTarget(DNN_TARGETS[self.target])
+        return net
+
+    @property
+    def detector(self):
+        if self._detector is None:
+            self.load_models()
+        return self._detector
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self.load_models()
+        return self._embedder
+
+    def load_store(self):
+        """Carrega todas as pessoas da galeria persistente, sem rodar nenhuma rede."""
+        start = time.perf_counter()
+        names, embeddings = self.store.live()
+        # Cópia: known_faces não pode prender o mmap, que muda de arquivo ao crescer ou compactar
+        embeddings = np.array(embeddings, dtype=np.float32)
+        self.matcher.add_many(names, embeddings)
+        for name, embedding in zip(names, embeddings):
+            self.known_faces[name] = {'embedding': embedding, 'appearances': 0, 'screen_time': 0}
+        self.load_times['gallery'] = time.perf_counter() - start
+
+    def clone(self):
+        """Nova instância com redes próprias, compartilhando o mesmo banco de dados."""
+        other = FaceRecognizer(self.matcher, self.max_batch_size, self.store, self.cache,
+                               self.model_dir, self.backend, self.target, name_key=self.name_key,
+                               detection_mode=self.detection_mode, tile_size=self.tile_size, tile_overlap=self.tile_overlap,
+                               thread_safe=self.thread_safe, lazy=self.lazy, metrics=self.metrics)
+        other.known_faces = self.known_faces
+        return other
+
+    def _forward(self, net, blob):
+        """Passada de uma rede, serializada pelo lock quando thread_safe=True."""
+        with self._lock:
+            net.setInput(blob)
+            return net.forward()
+
+    def add_known_face(self, name, image_path):
+        """Adiciona uma pessoa ao banco de dados."""
+        try:
+            image = cv2.imread(image_path)
+            if image is None:
+                print(f"Não foi possível ler a imagem em: {image_path}")
+                return False
+
+            # Detecção de rosto na imagem de referência
+            face = self.detect_best_faces([image])[0]
+            if face is not None:
+                embedding = self.embed_faces([face])[0]
+                self.add_embeddings([name], [embedding])
+                return True
+        except Exception as e:
+            print(f"Não foi possível adicionar a pessoa {name}: {e}")
+            return False
+        return False
+
+    def add_embeddings(self, names, embeddings):
+        """Cadastra embeddings já calculados (na busca, no banco e na galeria persistente)."""
+        names = [self.name_key(name) for name in names] if self.name_key else list(names)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        for name, embedding in zip(names, embeddings):
+            self.known_faces[name] = {'embedding': embedding, 'appearances': 0, 'screen_time': 0}
+        self.matcher.add_many(names, embeddings)
+        if self.store is not None:
+            self.store.add_many(names, embeddings)
+
+    def detect_best_faces(self, images):
+        """Roda o detector em lote e retorna o recorte do rosto mais confiável de cada imagem (ou None)."""
+        blob = cv2.dnn.blobFromImages([cv2.resize(image, (300, 300)) for image in images], 1.0, (300, 300), (104.0, 177.0, 123.0))
+        detections = self._forward(self.detector, blob).reshape(-1, 7)
+
+        faces = [None] * len(images)
+        best = [CONFIDENCE_THRESHOLD] * len(images)
+        # Coluna 0 = índice da imagem no lote, coluna 2 = confiança
+        for detection in detections:
+            i, confidence = int(detection[0]), detection[2]
+            if 0 <= i < len(images) and confidence > best[i]:
+                (h, w) = images[i].shape[:2]
+                box = np.clip(detection[3:7], 0.0, 1.0) * np.array([w, h, w, h])
+                (startX, startY, endX, endY) = box.astype("int")
+                face = images[i][startY:endY, startX:endX]
+                if face.shape[0] >= 20 and face.shape[1] >= 20:
+                    best[i] = confidence
+                    faces[i] = face
+        return faces
+
+    def embed_faces(self, face_rois):
+        """Calcula os embeddings de vários rostos em lotes de até max_batch_size."""
+        embeddings = []
+        for i in range(0, len(face_rois), self.max_batch_size):
+            batch = face_rois[i:i + self.max_batch_size]
+            with stage(self.metrics, 'embedder_blob'):
+                blob = cv2.dnn.blobFromImages(batch, 1.0 / 255, (96, 96), (0, 0, 0), swapRB=True, crop=False)
+            with stage(self.metrics, 'embedder'):
+                embeddings.append(self._forward(self.embedder, blob).reshape(len(batch), -1))
+        return np.vstack(embeddings)
+
+    def _tiles(self, h, w, regions=None):
+        """Blocos (x0, y0, x1, y1) sobrepostos que cobrem o quadro, ou só as regiões informadas."""
+        step = max(1, int(self.tile_size * (1 - self.tile_overlap)))
+        xs = list(range(0, max(w - self.tile_size, 0) + 1, step))
+        ys = list(range(0, max(h - self.tile_size, 0) + 1, step))
+        # O último bloco de cada eixo encosta na borda do quadro
+        if xs[-1] + self.tile_size < w:
+            xs.append(w - self.tile_size)
+        if ys[-1] + self.tile_size < h:
+            ys.append(h - self.tile_size)
+        tiles = [(x, y, min(x + self.tile_size, w), min(y + self.tile_size, h)) for y in ys for x in xs]
+        if regions is not None:
+            tiles = [tile for tile in tiles
+                     if any(tile[0] < endX and startX < tile[2] and tile[1] < endY and startY < tile[3]
+                            for (startX, startY, endX, endY) in regions)]
+        return tiles
+
+    def detect_faces(self, frame, regions=None):
+        """Executa o detector e retorna as caixas e os recortes dos rostos válidos.
+
+        No modo 'tiled', `regions` (caixas em pixels do quadro) limita os blocos
+        às áreas de interesse, ex.: onde houve movimento; None usa o quadro todo.
+        """
+        return self.detect_faces_batch([frame], [regions])[0]
+
+    def detect_faces_batch(self, frames, regions=None):
+        """Como detect_faces para vários quadros (ex.: de câmeras diferentes) em lotes únicos.
+
+        Retorna uma lista de (caixas, recortes), um item por quadro.
+        """
+        regions = regions if regions is not None else [None] * len(frames)
+        # Cada vista é (índice do quadro, x0, y0, x1, y1)
+        views = []
+        for f, (frame, frame_regions) in enumerate(zip(frames, regions)):
+            (h, w) = frame.shape[:2]
+            views.append((f, 0, 0, w, h))
+            if self.detection_mode == 'tiled' and max(h, w) > self.tile_size:
+                views += [(f,) + tile for tile in self._tiles(h, w, frame_regions)]
+
+        candidates = [[] for _ in frames]
+        scores = [[] for _ in frames]
+        # Quadros inteiros (rostos grandes) e blocos (rostos pequenos) no mesmo lote
+        for i in range(0, len(views), self.max_batch_size):
+            batch = views[i:i + self.max_batch_size]
+            with stage(self.metrics, 'resize'):
+                crops = [cv2.resize(frames[f][y0:y1, x0:x1], (300, 300)) for (f, x0, y0, x1, y1) in batch]
+            with stage(self.metrics, 'blob'):
+                blob = cv2.dnn.blobFromImages(crops, 1.0, (300, 300), (104.0, 177.0, 123.0))
+            with stage(self.metrics, 'detector'):
+                detections = self._forward(self.detector, blob).reshape(-1, 7)
+            # Coluna 0 = índice do recorte no lote, coluna 2 = confiança
+            detections = detections[(detections[:, 2] > CONFIDENCE_THRESHOLD) & (detections[:, 0] >= 0)]
+            for detection in detections:
+                (f, x0, y0, x1, y1) = batch[int(detection[0])]
+                box = np.clip(detection[3:7], 0.0, 1.0) * np.array([x1 - x0, y1 - y0, x1 - x0, y1 - y0])
+                candidates[f].append(box + np.array([x0, y0, x0, y0]))
+                scores[f].append(float(detection[2]))
+
+        results = []
+        for frame, frame_candidates, frame_scores in zip(frames, candidates, scores):
+            if len(frame_candidates) > 1:
+                # Caixas sobrepostas do mesmo rosto (do SSD ou de blocos vizinhos) viram uma só,
+                # antes de gastar uma passada do modelo de embeddings com cada uma
+                with stage(self.metrics, 'nms'):
+                    rects = [[float(startX), float(startY), float(endX - startX), float(endY - startY)]
+                             for (startX, startY, endX, endY) in frame_candidates]
+                    keep = np.array(cv2.dnn.NMSBoxes(rects, frame_scores, CONFIDENCE_THRESHOLD, NMS_THRESHOLD)).reshape(-1)
+                    frame_candidates = [frame_candidates[i] for i in keep]
+
+            boxes = []
+            face_rois = []
+            for box in frame_candidates:
+                (startX, startY, endX, endY) = box.astype("int")
+                face_roi = frame[startY:endY, startX:endX]
+                if face_roi.shape[0] < 20 or face_roi.shape[1] < 20:
+                    continue
+
+                boxes.append((startX, startY, endX, endY))
+                face_rois.append(face_roi)
+            results.append((boxes, face_rois))
+        return results
+
+    def embed_faces_cached(self, face_rois, boxes):
+        """Como embed_faces, mas só envia à rede os recortes que não estão no cache."""
+        if self.cache is None:
+            return self.embed_faces(face_rois)
+
+        keys = [self.cache.key(face_roi, box) for face_roi, box in zip(face_rois, boxes)]
+        embeddings = [self.cache.get(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            computed = self.embed_faces([face_rois[i] for i in missing])
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+                self.cache.put(keys[i], embedding)
+        return np.vstack(embeddings)
+
+    def cache_stats(self):
+        """Acertos e faltas do cache de embeddings (None se desativado)."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def identify_faces(self, face_rois, boxes=None, exclude=()):
+        """Retorna (nome, embedding) de cada recorte; nome é "Desconhecido" acima do limiar.
+
+        Cada pessoa é atribuída a no máximo um rosto do quadro (o mais parecido);
+        `exclude` são nomes já atribuídos a outros rostos. Com as caixas
+        informadas, o cache de embeddings é consultado antes da rede.
+        """
+        if not face_rois:
+            return []
+
+        # Uma única passada do modelo de embeddings para todos os rostos do quadro
+        if boxes is not None:
+            embeddings = self.embed_faces_cached(face_rois, boxes)
+        else:
+            embeddings = self.embed_faces(face_rois)
+
+        return self._match(embeddings, exclude)
+
+    def _match(self, embeddings, exclude=()):
+        # Compara todos os rostos do quadro com a galeria de uma só vez
+        with stage(self.metrics, 'matching'):
+            matches = self.matcher.assign(embeddings, RECOGNITION_THRESHOLD, ASSIGNMENT_CANDIDATES, exclude)
+        return [(name if name is not None else "Desconhecido", embedding)
+                for embedding, (name, _) in zip(embeddings, matches)]
+
+    def recognize_face(self, frame, regions=None):
+        """Detecta e reconhece rostos em um quadro (ver detect_faces para `regions`).
+
+        Retorna uma lista com um item {'name', 'box', 'embedding'} por rosto;
+        vários rostos podem ser "Desconhecido" no mesmo quadro.
+        """
+        with stage(self.metrics, 'recognize'):
+            boxes, face_rois = self.detect_faces(frame, regions)
+
+            recognized_people = [{'name': name, 'box': box, 'embedding': embedding}
+                                 for box, (name, embedding) in zip(boxes, self.identify_faces(face_rois, boxes))]
+
+        return recognized_people
+
+    def recognize_faces(self, frames):
+        """recognize_face para vários quadros: um lote do detector e um do modelo de embeddings.
+
+        A atribuição um-para-um dos nomes continua separada por quadro.
+        """
+        with stage(self.metrics, 'recognize_batch'):
+            detected = self.detect_faces_batch(frames)
+            all_boxes = [box for boxes, _ in detected for box in boxes]
+            all_rois = [roi for _, rois in detected for roi in rois]
+            embeddings = self.embed_faces_cached(all_rois, all_boxes) if all_rois else None
+
+            results = []
+            offset = 0
+            for boxes, _ in detected:
+                recognized_people = []
+                if boxes:
+                    identities = self._match(embeddings[offset:offset + len(boxes)])
+                    recognized_people = [{'name': name, 'box': box, 'embedding': embedding}
+                                         for box, (name, embedding) in zip(boxes, identities)]
+                offset += len(boxes)
+                results.append(recognized_people)
+        return results
+
+    def remove_known_face(self, name):
+        """Remove uma pessoa do banco de dados."""
+        if self.name_key:
+            name = self.name_key(name)
+        self.known_faces.pop(name, None)
+        if self.store is not None:
+            self.store.delete(name)
+        return self.matcher.remove(name)
@@ -0,0 +1,171 @@
+import collections
+import os
+import queue
+import threading
+import time
+import cv2
+
+# --- Gravação dos Quadros Anotados ---
+
+UNKNOWN = "Desconhecido"
+
+
+def draw_recognized_people(frame, recognized_people):
+    """Desenha as caixas e os nomes das pessoas reconhecidas (lista de recognize_face) no quadro."""
+    for person in recognized_people:
+        name = person['name']
+        (startX, startY, endX, endY) = person['box']
+
+        # Define a cor e o texto do rótulo
+        color = (0, 255, 0) if name != UNKNOWN else (0, 0, 255)
+
+        # Desenha a caixa delimitadora
+        cv2.rectangle(frame, (startX, startY), (endX, endY), color, 2)
+
+        # Acima da caixa, ou dentro dela se não houver espaço
+        y = startY - 15 if startY - 15 > 15 else startY + 15
+        cv2.putText(frame, name, (startX, y), cv2.FONT_HERSHEY_SIMPLEX, 0.75, color, 2)
+    return frame
+
+
+class AnnotatedVideoWriter:
+    """Grava quadros anotados com cv2.VideoWriter em uma thread de codificação própria.
+
+    write() só coloca o quadro em uma fila limitada e volta na hora; se o
+    codificador não der conta, o quadro é descartado (e contado) em vez de
+    atrasar o reconhecimento. O quadro não deve ser alterado depois de
+    entregue.
+
+    Com events_only=False tudo vai para `path`. Com events_only=True só são
+    gravados clipes curtos em torno dos quadros com alguém reconhecido: os
+    `pre_seconds` anteriores (mantidos em memória) até `post_seconds` depois
+    do último reconhecimento, cada clipe em um arquivo `path` numerado
+    (video_0001.mp4, ...). `clips` lista (arquivo, início, fim, nomes).
+
+    close() sinaliza a thread por um Event (nunca bloqueia com a fila
+    cheia); ela grava o que ainda está na fila e fecha o arquivo. A thread
+    não é daemon, então o arquivo é finalizado mesmo se o programa sair logo
+    depois.
+    """
+
+    def __init__(self, path, fps=25.0, fourcc='mp4v', queue_size=64, events_only=False, pre_seconds=2.0, post_seconds=3.0):
+        self.path = path
+        self.fps = fps
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.events_only = events_only
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.written_frames = 0
+        self.dropped_frames = 0
+        self.clips = []
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._writer = None
+        self._pre_buffer = collections.deque()
+        self._clip = None  # [arquivo, início, fim, nomes] do clipe aberto
+        self._last_event = None
+        self._closed = False
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='video-writer')
+        self._thread.start()
+
+    def write(self, frame, recognized_people=None, timestamp=None):
+        """Enfileira o quadro (já anotado); `recognized_people` decide os clipes no modo events_only.
+
+        `timestamp` é o tempo do quadro no vídeo em segundos (padrão: relógio).
+        Retorna False se o quadro foi descartado.
+        """
+        if self._closed:
+            return False
+        names = {person['name'] for person in (recognized_people or ()) if person['name'] != UNKNOWN}
+        try:
+            self._frames.put_nowait((frame, names, time.monotonic() if timestamp is None else timestamp))
+            return True
+        except queue.Full:
+            self.dropped_frames += 1
+            return False
+
+    def close(self, wait=True, timeout=10.0):
+        """Grava o que ainda está na fila e fecha o arquivo.
+
+        Com wait=False só sinaliza e retorna (ex.: na thread do Tk); `finished`
+        indica quando o arquivo foi fechado.
+        """
+        self._closed = True
+        self._stopping.set()
+        if wait:
+            self._thread.join(timeout)
+
+    @property
+    def finished(self):
+        return not self._thread.is_alive()
+
+    def _open(self, path, frame):
+        (h, w) = frame.shape[:2]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = cv2.VideoWriter(path, self.fourcc, self.fps, (w, h))
+
+    def _encode(self, frame):
+        self._writer.write(frame)
+        self.written_frames += 1
+
+    def _run(self):
+        try:
+            while True:
+                try:
+                    frame, names, timestamp = self._frames.get(timeout=0.1)
+                except queue.Empty:
+                    # Só termina com a fila vazia: o fim do vídeo não se perde
+                    if self._stopping.is_set():
+                        break
+                    continue
+                if not self.events_only:
+                    if self._writer is None:
+                        self._open(self.path, frame)
+                    self._encode(frame)
+                else:
+                    self._handle_event_frame(frame, names, timestamp)
+        finally:
+            self._close_clip()
+            if self._writer is not None:
+                self._writer.release()
+                self._writer = None
+
+    def _handle_event_frame(self, frame, names, timestamp):
+        if names:
+            self._last_event = timestamp
+            if self._clip is None:
+                base, extension = os.path.splitext(self.path)
+                path = f"{base}_{len(self.clips) + 1:04d}{extension}"
+                start = self._pre_buffer[0][1] if self._pre_buffer else timestamp
+                self._clip = [path, start, timestamp, set()]
+                self._open(path, frame)
+                # Os segundos anteriores ao reconhecimento entram no início do clipe
+                for buffered, _ in self._pre_buffer:
+                    self._encode(buffered)
+                self._pre_buffer.clear()
+            self._clip[3].update(names)
+
+        if self._clip is not None:
+            self._encode(frame)
+            self._clip[2] = timestamp
+            if timestamp - self._last_event > self.post_seconds:
+                self._close_clip()
+        else:
+            self._pre_buffer.append((frame, timestamp))
+            while self._pre_buffer and timestamp - self._pre_buffer[0][1] > self.pre_seconds:
+                self._pre_buffer.popleft()
+
+    def _close_clip(self):
+        if self._clip is None:
+            return
+        self._writer.release()
+        self._writer = None
+        path, start, end, names = self._clip
+        self.clips.append((path, start, end, sorted(names)))
+        self._clip = None
+
+    def stats(self):
+        return {'written': self.written_frames, 'dropped': self.dropped_frames, 'queued': self._frames.qsize(),
+                'clips': len(self.clips)}
@@ -0,0 +1,157 @@
+import collections
+import threading
+import time
+import cv2
+
+# --- Leitura de Fontes de Rede (RTSP/HTTP) ---
+
+RECONNECT_INITIAL_DELAY = 0.5 # Segundos antes da primeira tentativa de reconexão
+RECONNECT_MAX_DELAY = 30.0 # Teto da espera entre tentativas (dobra a cada falha)
+READ_POLL = 0.1 # Intervalo em que read() verifica se o leitor foi encerrado
+
+
+class StreamReader:
+    """Substituto do cv2.VideoCapture para streams: decodifica em uma thread própria.
+
+    A conexão e a decodificação acontecem só na thread do leitor, então
+    criar o leitor e chamar read() nunca travam por causa da rede. Ficam
+    guardados apenas os `buffer_size` quadros mais novos; os mais antigos são
+    descartados. Se a conexão cair (ou o stream terminar, com reconnect=True)
+    o leitor tenta de novo com espera exponencial, até `max_retries`
+    falhas seguidas (None = sem limite), até `stop_flag` ser acionado ou até
+    release().
+
+    read() espera pelo próximo quadro e retorna (False, None) só quando o
+    leitor foi encerrado. Cada quadro tem um tempo em segundos desde o início
+    da leitura, vindo da posição do stream (CAP_PROP_POS_MSEC) quando
+    disponível e do relógio caso contrário; ele continua crescendo após
+    reconexões e é devolvido por get(cv2.CAP_PROP_POS_MSEC), como no
+    VideoCapture.
+    """
+
+    def __init__(self, source, buffer_size=1, reconnect=True, max_retries=None, stop_flag=None,
+                 initial_delay=RECONNECT_INITIAL_DELAY, max_delay=RECONNECT_MAX_DELAY, api_preference=cv2.CAP_ANY):
+        self.source = source
+        self.reconnect = reconnect
+        self.max_retries = max_retries
+        self.stop_flag = stop_flag
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.api_preference = api_preference
+        self.state = 'connecting'  # 'connecting', 'streaming', 'reconnecting' ou 'closed'
+        self.frames_read = 0
+        self.dropped_frames = 0
+        self.reconnects = 0
+        self.fps = 0.0
+        self._buffer = collections.deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._start = time.monotonic()
+        self._timestamp = 0.0
+        self._last_decoded = 0.0
+        self._thread = threading.Thread(target=self._run, name='stream-reader', daemon=True)
+        self._thread.start()
+
+    def _stopped(self):
+        return self._stop.is_set() or (self.stop_flag is not None and self.stop_flag.is_set())
+
+    def _open(self):
+        capture = cv2.VideoCapture(self.source, self.api_preference)
+        if capture.isOpened():
+            return capture
+        capture.release()
+        return None
+
+    def _run(self):
+        failures = 0
+        try:
+            while not self._stopped():
+                capture = self._open()
+                if capture is not None:
+                    with self._condition:
+                        self.state = 'streaming'
+                    self.fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+                    if self._decode(capture):
+                        failures = 0
+                    capture.release()
+                    if not self.reconnect:
+                        break
+                if self._stopped():
+                    break
+
+                failures += 1
+                if self.max_retries is not None and failures > self.max_retries:
+                    break
+                with self._condition:
+                    self.state = 'reconnecting'
+                self.reconnects += 1
+                retry_at = time.monotonic() + min(self.max_delay, self.initial_delay * 2 ** (failures - 1))
+                while not self._stopped() and time.monotonic() < retry_at:
+                    self._stop.wait(min(READ_POLL, retry_at - time.monotonic()))
+        finally:
+            with self._condition:
+                self.state = 'closed'
+                self._condition.notify_all()
+
+    def _decode(self, capture):
+        """Lê até a conexão cair; retorna True se algum quadro chegou."""
+        connected_at = time.monotonic() - self._start
+        got_frames = False
+        while not self._stopped():
+            ret, frame = capture.read()
+            if not ret:
+                break
+            got_frames = True
+            position = capture.get(cv2.CAP_PROP_POS_MSEC)
+            if position > 0:
+                timestamp = connected_at + position / 1000.0
+            else:
+                timestamp = time.monotonic() - self._start
+            # Nunca volta no tempo, mesmo quando a fonte do tempo muda
+            timestamp = self._last_decoded = max(timestamp, self._last_decoded)
+            with self._condition:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.dropped_frames += 1
+                self._buffer.append((frame, timestamp))
+                self.frames_read += 1
+                self._condition.notify_all()
+        return got_frames
+
+    def read(self, timeout=None):
+        """Próximo quadro do buffer, esperando por ele; (False, None) se o leitor foi encerrado.
+
+        Com `timeout` (segundos) também retorna (False, None) se nenhum quadro chegar a tempo.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self._buffer:
+                if self.state == 'closed' or self._stopped():
+                    return False, None
+                wait = READ_POLL if deadline is None else min(READ_POLL, deadline - time.monotonic())
+                if wait <= 0:
+                    return False, None
+                self._condition.wait(wait)
+            frame, self._timestamp = self._buffer.popleft()
+            return True, frame
+
+    def isOpened(self):
+        return self.state != 'closed'
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return 1000.0 * self._timestamp
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0.0
+
+    def release(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout=1.0)
+
+    def stats(self):
+        with self._condition:
+            return {'state': self.state, 'frames_read': self.frames_read, 'dropped': self.dropped_frames,
+                    'reconnects': self.reconnects, 'buffered': len(self._buffer)}
@@ -0,0 +1,38 @@
+import contextlib
+import threading
+import time
+
+# --- Medição do Tempo de Inicialização ---
+
+class StartupReport:
+    """Tempo de cada componente da inicialização, medido em qualquer thread.
+
+    measure(nome) cronometra um bloco; mark(nome) registra quanto tempo se
+    passou desde a criação do relatório (ex.: "janela visível").
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.components = []  # (nome, segundos), na ordem em que terminaram
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.components.append((name, seconds))
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def mark(self, name):
+        self.record(name, time.perf_counter() - self.start)
+
+    def format(self):
+        with self._lock:
+            components = list(self.components)
+        width = max((len(name) for name, _ in components), default=0)
+        return "\n".join(f"  {name:<{width}} {1000.0 * seconds:8.1f} ms" for name, seconds in components)
@@ -0,0 +1,163 @@
+import cv2
+import numpy as np
+
+# --- Rastreamento de Rostos entre Quadros-Chave ---
+
+def box_iou(a, b):
+    """Interseção sobre união de duas caixas (startX, startY, endX, endY)."""
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    def __init__(self, track_id, box, name, embedding):
+        self.id = track_id
+        self.box = box
+        self.name = name
+        self.embedding = embedding
+        self.points = None  # pontos seguidos pelo fluxo óptico
+
+
+class FaceTracker:
+    """Roda detector e embeddings só em quadros-chave e segue as caixas entre eles.
+
+    A cada `detect_every` quadros (ou quando um rastro é perdido) o detector
+    roda e as detecções são associadas aos rastros por IoU. Rastros associados
+    mantêm o nome sem recalcular o embedding, a menos que a caixa tenha se
+    deslocado (IoU < drift_iou) ou o rosto ainda seja desconhecido. Nos demais
+    quadros as caixas são movidas por fluxo óptico (Lucas-Kanade) sobre pontos
+    de canto dentro de cada rosto.
+
+    Tem a mesma interface recognize_face(frame) do FaceRecognizer, mas precisa
+    receber os quadros em ordem (uma única thread por vídeo).
+    """
+
+    def __init__(self, recognizer, detect_every=5, match_iou=0.3, drift_iou=0.5, min_points=4):
+        self.recognizer = recognizer
+        self.detect_every = max(1, detect_every)
+        self.match_iou = match_iou
+        self.drift_iou = drift_iou
+        self.min_points = min_points
+        self.tracks = []
+        self.frame_index = 0
+        self._next_id = 0
+        self._prev_gray = None
+        # Contadores para medir a economia de inferência
+        self.detector_runs = 0
+        self.embedded_faces = 0
+
+    @property
+    def known_faces(self):
+        return self.recognizer.known_faces
+
+    def reset(self):
+        self.tracks = []
+        self.frame_index = 0
+        self._prev_gray = None
+
+    def recognize_face(self, frame, regions=None):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        keyframe = self.frame_index % self.detect_every == 0 or self._prev_gray is None
+        if not keyframe and self.tracks:
+            # Perda de rastro força uma nova detecção neste mesmo quadro
+            keyframe = not self._propagate(gray)
+        if keyframe:
+            self._update_with_detections(frame, regions)
+            self._reset_points(gray)
+
+        self._prev_gray = gray
+        self.frame_index += 1
+
+        return [{'name': track.name, 'box': track.box, 'embedding': track.embedding, 'track_id': track.id}
+                for track in self.tracks]
+
+    def _propagate(self, gray):
+        """Move as caixas pelo fluxo óptico; retorna False se algum rastro foi perdido."""
+        tracks = [track for track in self.tracks if track.points is not None]
+        if len(tracks) < len(self.tracks):
+            return False
+        counts = [len(track.points) for track in tracks]
+        prev_points = np.concatenate([track.points for track in tracks]).astype(np.float32)
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, prev_points, None)
+        status = status.reshape(-1).astype(bool)
+
+        (h, w) = gray.shape[:2]
+        offset = 0
+        for track, count in zip(tracks, counts):
+            ok = status[offset:offset + count]
+            old = prev_points[offset:offset + count][ok].reshape(-1, 2)
+            new = next_points[offset:offset + count][ok].reshape(-1, 2)
+            offset += count
+            if len(new) < self.min_points:
+                return False
+
+            # Deslocamento mediano e escala pela dispersão dos pontos
+            dx, dy = np.median(new - old, axis=0)
+            old_spread = np.std(old, axis=0).mean()
+            scale = np.std(new, axis=0).mean() / old_spread if old_spread > 0 else 1.0
+            (startX, startY, endX, endY) = track.box
+            cx, cy = (startX + endX) / 2 + dx, (startY + endY) / 2 + dy
+            half_w, half_h = (endX - startX) * scale / 2, (endY - startY) * scale / 2
+            track.box = (int(max(0, cx - half_w)), int(max(0, cy - half_h)),
+                         int(min(w, cx + half_w)), int(min(h, cy + half_h)))
+            track.points = new.reshape(-1, 1, 2)
+            if track.box[2] - track.box[0] < 20 or track.box[3] - track.box[1] < 20:
+                return False
+        return True
+
+    def _update_with_detections(self, frame, regions=None):
+        self.detector_runs += 1
+        boxes, face_rois = self.recognizer.detect_faces(frame, regions)
+
+        # Associação gulosa detecção -> rastro pela maior IoU
+        pairs = sorted(((box_iou(box, track.box), d, t)
+                        for d, box in enumerate(boxes) for t, track in enumerate(self.tracks)), reverse=True)
+        track_of = {}
+        used_tracks = set()
+        for iou, d, t in pairs:
+            if iou < self.match_iou:
+                break
+            if d not in track_of and t not in used_tracks:
+                track_of[d] = t
+                used_tracks.add(t)
+
+        # Só recalcula embeddings de rostos novos, deslocados ou ainda desconhecidos
+        to_embed = []
+        for d, box in enumerate(boxes):
+            t = track_of.get(d)
+            if t is None or self.tracks[t].name == "Desconhecido" or box_iou(box, self.tracks[t].box) < self.drift_iou:
+                to_embed.append(d)
+        # Nomes mantidos pelos rastros que não serão reidentificados ficam fora da atribuição
+        kept = {self.tracks[track_of[d]].name for d in range(len(boxes)) if d in track_of and d not in to_embed}
+        identities = self.recognizer.identify_faces([face_rois[d] for d in to_embed], [boxes[d] for d in to_embed],
+                                                    exclude=kept - {"Desconhecido"})
+        self.embedded_faces += len(to_embed)
+        identity_of = dict(zip(to_embed, identities))
+
+        tracks = []
+        for d, box in enumerate(boxes):
+            t = track_of.get(d)
+            if t is not None:
+                track = self.tracks[t]
+                track.box = box
+            else:
+                track = Track(self._next_id, box, None, None)
+                self._next_id += 1
+            if d in identity_of:
+                track.name, track.embedding = identity_of[d]
+            tracks.append(track)
+        self.tracks = tracks
+
+    def _reset_points(self, gray):
+        for track in self.tracks:
+            (startX, startY, endX, endY) = track.box
+            mask = np.zeros_like(gray)
+            mask[startY:endY, startX:endX] = 255
+            points = cv2.goodFeaturesToTrack(gray, maxCorners=30, qualityLevel=0.01, minDistance=3, mask=mask)
+            track.points = points if points is not None and len(points) >= self.min_points else None
+
+    def stats(self):
+        return {'frames': self.frame_index, 'detector_runs': self.detector_runs, 'embedded_faces': self.embedded_faces}
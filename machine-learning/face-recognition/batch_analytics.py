@@ -0,0 +1,90 @@
+"""Análise de vídeos em lote, sem interface gráfica.
+
+Processa todos os vídeos de um diretório em paralelo (um processo por
+núcleo, cada um com suas próprias redes do cv2.dnn) e grava o tempo de tela
+e os intervalos de aparição de cada pessoa em JSON ou CSV. Com --chunks,
+cada vídeo é dividido em trechos processados em paralelo (para um único
+vídeo longo). Com --record, os quadros anotados são gravados em vídeo
+(inteiros, ou só clipes em torno dos reconhecimentos com --events-only).
+
+Uso:
+    python batch_analytics.py VIDEOS_DIR --gallery FOTOS_DIR --output resultados.json
+    python batch_analytics.py gravacao_10h.mp4 --gallery FOTOS_DIR --chunks 16
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import engine_path  # noqa: F401
+from face_engine import FaceRecognizer, GalleryStore, analyze_video_chunked, analyze_videos, load_gallery
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+
+def write_json(all_results, output):
+    json.dump(all_results, output, indent=2, ensure_ascii=False)
+
+
+def write_csv(all_results, output):
+    writer = csv.writer(output)
+    writer.writerow(['video', 'pessoa', 'tempo_de_tela', 'aparicoes', 'inicio', 'fim'])
+    for video_path, results in sorted(all_results.items()):
+        for name, data in sorted(results.items()):
+            for start, end in data['intervals']:
+                writer.writerow([video_path, name, f"{data['screen_time']:.3f}", data['appearances'], f"{start:.3f}", f"{end:.3f}"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('videos', help="diretório com os vídeos (ou um único arquivo)")
+    gallery = parser.add_mutually_exclusive_group(required=True)
+    gallery.add_argument('--gallery', help="diretório com uma foto por pessoa (nome do arquivo = nome)")
+    gallery.add_argument('--gallery-store', help="galeria persistente já cadastrada (GalleryStore)")
+    parser.add_argument('--output', help="arquivo de saída (.json ou .csv); padrão: stdout em JSON")
+    parser.add_argument('--format', choices=['json', 'csv'], help="formato de saída (padrão: pela extensão)")
+    parser.add_argument('--detect-every', type=int, default=1, help="roda o detector a cada N quadros e rastreia entre eles")
+    parser.add_argument('--detection-mode', choices=['full', 'tiled'], default='full', help="'tiled' divide quadros grandes em blocos (rostos distantes)")
+    parser.add_argument('--workers', type=int, default=None, help="processos em paralelo (padrão: núcleos da CPU)")
+    parser.add_argument('--record', metavar='DIR', help="grava os vídeos anotados neste diretório")
+    parser.add_argument('--events-only', action='store_true', help="com --record, grava só clipes em torno dos reconhecimentos")
+    parser.add_argument('--chunks', type=int, default=0, help="divide cada vídeo em N trechos paralelos (0 = um processo por vídeo)")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.videos):
+        video_paths = [os.path.join(args.videos, f) for f in sorted(os.listdir(args.videos))
+                       if f.lower().endswith(VIDEO_EXTENSIONS)]
+    else:
+        video_paths = [args.videos]
+
+    if args.gallery_store:
+        recognizer = FaceRecognizer(store=GalleryStore(args.gallery_store, readonly=True))
+    else:
+        recognizer = FaceRecognizer()
+        load_gallery(recognizer, args.gallery)
+
+    start = time.perf_counter()
+    if args.chunks:
+        all_results = {}
+        for video_path in video_paths:
+            all_results[video_path], frames = analyze_video_chunked(video_path, recognizer, args.workers, args.chunks,
+                                                                    args.detect_every, args.detection_mode,
+                                                                    record_dir=args.record, events_only=args.events_only)
+            print(f"{video_path}: {frames} quadros em {args.chunks} trechos", file=sys.stderr)
+    else:
+        all_results = analyze_videos(video_paths, recognizer, args.workers, args.detect_every, args.detection_mode,
+                                     args.record, args.events_only)
+    print(f"{len(video_paths)} vídeos em {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    output_format = args.format or ('csv' if args.output and args.output.endswith('.csv') else 'json')
+    write = write_csv if output_format == 'csv' else write_json
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as output:
+            write(all_results, output)
+    else:
+        write(all_results, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Mede o ganho de dividir um único vídeo longo em trechos paralelos.
+
+Gera um vídeo sintético com cv2.VideoWriter (fundo em movimento e, com
+--face, uma foto de rosto que entra e sai de cena em momentos conhecidos),
+analisa primeiro em sequência e depois com 1, 2, 4... processos, e mostra o
+tempo, o ganho e se os intervalos de presença batem com os da análise
+sequencial. Precisa dos modelos em ./models/.
+
+Uso:
+    python benchmark_chunked.py --seconds 120 --face fotos/ana.jpg
+"""
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+import engine_path  # noqa: F401
+from face_engine import FaceRecognizer, analyze_video, analyze_video_chunked
+
+FPS = 25
+FRAME_SIZE = (640, 360)
+# Trechos em que o rosto aparece, como frações da duração do vídeo
+FACE_SCHEDULE = [(0.05, 0.20), (0.30, 0.32), (0.45, 0.70), (0.85, 1.0)]
+
+
+def make_video(path, seconds, face=None):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), FPS, FRAME_SIZE)
+    (w, h) = FRAME_SIZE
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 256, (h, 2 * w, 3), dtype=np.uint8)
+    if face is not None:
+        face = cv2.resize(face, (h // 2, h // 2))
+    frames = int(seconds * FPS)
+    for i in range(frames):
+        offset = (4 * i) % w
+        frame = np.ascontiguousarray(background[:, offset:offset + w])
+        progress = i / frames
+        if face is not None and any(start <= progress < end for start, end in FACE_SCHEDULE):
+            x = (w - face.shape[1]) // 2
+            frame[h // 4:h // 4 + face.shape[0], x:x + face.shape[1]] = face
+        writer.write(frame)
+    writer.release()
+    return frames
+
+
+def same_intervals(a, b, tolerance):
+    if a.keys() != b.keys():
+        return False
+    for name in a:
+        if len(a[name]['intervals']) != len(b[name]['intervals']):
+            return False
+        if np.abs(np.array(a[name]['intervals']) - np.array(b[name]['intervals'])).max() > tolerance:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=60.0, help="duração do vídeo sintético")
+    parser.add_argument('--face', help="foto de um rosto para colar no vídeo (e cadastrar)")
+    parser.add_argument('--workers', type=int, nargs='+', default=None, help="números de processos (padrão: 1, 2, 4... até os núcleos)")
+    args = parser.parse_args()
+
+    recognizer = FaceRecognizer()
+    face = None
+    if args.face:
+        face = cv2.imread(args.face)
+        if face is None or not recognizer.add_known_face('rosto', args.face):
+            parser.error(f"Nenhum rosto encontrado em {args.face}")
+
+    cores = os.cpu_count()
+    workers = args.workers or sorted({1, cores} | {2 ** i for i in range(1, cores.bit_length()) if 2 ** i <= cores})
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sintetico.avi')
+        frames = make_video(path, args.seconds, face)
+        print(f"Vídeo sintético: {frames} quadros de {FRAME_SIZE[0]}x{FRAME_SIZE[1]} ({args.seconds:.0f}s), {cores} núcleos")
+
+        start = time.perf_counter()
+        reference, _ = analyze_video(recognizer, path)
+        sequential = time.perf_counter() - start
+        print(f"{'processos':>9} {'tempo (s)':>10} {'quadros/s':>10} {'ganho':>7} {'iguais':>7}")
+        print(f"{'seq.':>9} {sequential:>10.1f} {frames / sequential:>10.1f} {1.0:>6.1f}x {'-':>7}")
+        for n in workers:
+            start = time.perf_counter()
+            results, processed = analyze_video_chunked(path, recognizer, workers=n)
+            elapsed = time.perf_counter() - start
+            match = processed == frames and same_intervals(reference, results, 0.5 / FPS)
+            print(f"{n:>9} {elapsed:>10.1f} {frames / elapsed:>10.1f} {sequential / elapsed:>6.1f}x {'sim' if match else 'NÃO':>7}")
+
+
+if __name__ == "__main__":
+    main()
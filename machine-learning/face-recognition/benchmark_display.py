@@ -0,0 +1,76 @@
+"""Mede o custo por quadro de exibir vídeo no Tkinter: caminho antigo vs FrameDisplay.
+
+Antigo: cvtColor -> Image.fromarray -> nova ImageTk.PhotoImage a cada quadro,
+no tamanho original. Novo: FrameDisplay (reduz antes, buffers e PhotoImage
+reaproveitados). Sem display disponível (ex.: servidor), mede só a
+conversão, sem a PhotoImage.
+
+Uso:
+    python benchmark_display.py --frames 200 --max-size 960 540
+"""
+import argparse
+import time
+import tkinter as tk
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+import engine_path  # noqa: F401
+from face_engine.display import FrameDisplay
+
+RESOLUTIONS = {'720p': (1280, 720), '1080p': (1920, 1080)}
+
+
+def old_path(label, frame):
+    image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    if label is not None:
+        imgtk = ImageTk.PhotoImage(image=image)
+        label.imgtk = imgtk
+        label.configure(image=imgtk)
+        label.update_idletasks()
+
+
+def timed(function, frames):
+    start = time.perf_counter()
+    for frame in frames:
+        function(frame)
+    return 1000.0 * (time.perf_counter() - start) / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--max-size', type=int, nargs=2, default=[960, 540], help="tamanho do widget (largura altura)")
+    args = parser.parse_args()
+
+    try:
+        root = tk.Tk()
+        label = tk.Label(root)
+        label.pack()
+    except tk.TclError:
+        root = label = None
+        print("Sem display: medindo só a conversão (sem PhotoImage)")
+
+    rng = np.random.default_rng(0)
+    print(f"{'resolução':>9} {'antigo (ms)':>12} {'novo (ms)':>10} {'ganho':>7}")
+    for name, (w, h) in RESOLUTIONS.items():
+        # Alguns quadros distintos, repetidos, para não medir só o cache da CPU
+        frames = [rng.integers(0, 256, (h, w, 3), dtype=np.uint8) for _ in range(4)] * (args.frames // 4)
+        old = timed(lambda frame: old_path(label, frame), frames)
+
+        # refresh_hz alto: mede o custo de cada pintura, sem o limite de taxa
+        display = FrameDisplay(label, tuple(args.max_size), refresh_hz=1e9)
+        if label is None:
+            new = timed(display.convert, frames)
+        else:
+            def paint(frame):
+                display.show(frame.copy())
+                label.update_idletasks()
+            new = timed(paint, frames) - timed(lambda frame: frame.copy(), frames)
+        print(f"{name:>9} {old:>12.2f} {new:>10.2f} {old / new:>6.1f}x")
+
+    if root is not None:
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
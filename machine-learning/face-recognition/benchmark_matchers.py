@@ -0,0 +1,97 @@
+"""Compara os backends aproximado (IVF) e quantizados com a busca exata em embeddings sintéticos.
+
+Além da latência e do recall@1, mostra a memória da matriz de embeddings e
+o erro médio da distância ao vizinho em relação à busca exata em float32.
+
+Uso:
+    python benchmark_matchers.py --sizes 10000 100000 1000000 --n-probe 4 8 16
+"""
+import argparse
+import time
+import numpy as np
+import engine_path  # noqa: F401
+from face_engine.matchers import ExactMatcher, IVFMatcher, QuantizedMatcher
+
+DIM = 128
+
+
+def synthetic_gallery(n, n_clusters=1000, seed=0):
+    """Embeddings normalizados agrupados em torno de centros aleatórios (como rostos reais)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, DIM)).astype(np.float32)
+    data = centers[rng.integers(0, n_clusters, n)] + 0.6 * rng.normal(size=(n, DIM)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data
+
+
+def synthetic_queries(gallery, n_queries, noise=0.05, seed=1):
+    """Consultas = embeddings da galeria com ruído (outra foto da mesma pessoa)."""
+    rng = np.random.default_rng(seed)
+    queries = gallery[rng.integers(0, len(gallery), n_queries)]
+    queries = queries + noise * rng.normal(size=queries.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def timed_search(matcher, queries, batch):
+    """Busca em lotes do tamanho de um quadro; retorna (nomes top-1, distâncias, ms por consulta)."""
+    names = []
+    dists = []
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        found_dists, found = matcher.search(queries[i:i + batch], k=1)
+        names.extend(found[:, 0])
+        dists.extend(found_dists[:, 0])
+    elapsed = time.perf_counter() - start
+    return names, np.array(dists), 1000.0 * elapsed / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=8, help="rostos por quadro")
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--precisions', nargs='*', choices=['float16', 'int8'], default=['float16', 'int8'])
+    args = parser.parse_args()
+
+    print(f"{'N':>9} {'backend':>18} {'build (s)':>10} {'MB':>8} {'ms/consulta':>12} {'recall@1':>9} {'erro dist':>10}")
+    for n in args.sizes:
+        gallery = synthetic_gallery(n)
+        names = np.arange(n)
+        queries = synthetic_queries(gallery, args.queries)
+
+        exact = ExactMatcher(DIM)
+        start = time.perf_counter()
+        exact.add_many(names, gallery)
+        build = time.perf_counter() - start
+        truth, truth_dists, latency = timed_search(exact, queries, args.batch)
+        memory = exact.index.embeddings.nbytes / 2**20
+        print(f"{n:>9} {'exact':>18} {build:>10.2f} {memory:>8.1f} {latency:>12.3f} {1.0:>9.3f} {0.0:>10.4f}")
+
+        for precision in args.precisions:
+            quantized = QuantizedMatcher(DIM, precision)
+            start = time.perf_counter()
+            quantized.add_many(names, gallery)
+            build = time.perf_counter() - start
+            found, dists, latency = timed_search(quantized, queries, args.batch)
+            recall = np.mean([a == b for a, b in zip(found, truth)])
+            error = np.mean(np.abs(dists - truth_dists))
+            print(f"{n:>9} {precision:>18} {build:>10.2f} {quantized.nbytes / 2**20:>8.1f} {latency:>12.3f} {recall:>9.3f} {error:>10.4f}")
+
+        n_lists = max(16, int(np.sqrt(n)))
+        ivf = IVFMatcher(DIM, n_lists=n_lists, train_size=n)
+        start = time.perf_counter()
+        ivf.add_many(names, gallery)
+        build = time.perf_counter() - start
+        for n_probe in args.n_probe:
+            ivf.n_probe = n_probe
+            found, dists, latency = timed_search(ivf, queries, args.batch)
+            recall = np.mean([a == b for a, b in zip(found, truth)])
+            error = np.mean(np.abs(dists - truth_dists))
+            label = f"ivf({n_lists}, {n_probe})"
+            memory = sum(index.embeddings.nbytes for index in ivf._lists) / 2**20
+            print(f"{n:>9} {label:>18} {build:>10.2f} {memory:>8.1f} {latency:>12.3f} {recall:>9.3f} {error:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Cadastro em massa de pessoas a partir de um diretório ou manifesto.
+
+O diretório pode ter uma subpasta por pessoa (várias fotos cada) ou fotos
+soltas cujo nome do arquivo é o nome da pessoa. O manifesto é um CSV com as
+colunas `nome,caminho`. Imagens já cadastradas (mesmo conteúdo) são puladas.
+
+Uso:
+    python bulk_enroll.py FOTOS_DIR --store ./gallery/ --aggregate medoid
+"""
+import argparse
+import csv
+import hashlib
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+import engine_path  # noqa: F401
+from face_engine import FaceRecognizer, GalleryStore
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+HASHES_FILE = 'hashes.tsv'
+
+
+def scan_directory(directory):
+    """Lista (nome, caminho): subpastas viram nomes; arquivos soltos usam o próprio nome."""
+    entries = []
+    for entry in sorted(os.listdir(directory)):
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path):
+            for file_name in sorted(os.listdir(path)):
+                if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                    entries.append((entry, os.path.join(path, file_name)))
+        elif entry.lower().endswith(IMAGE_EXTENSIONS):
+            entries.append((os.path.splitext(entry)[0], path))
+    return entries
+
+
+def read_manifest(manifest_path):
+    """Lê um CSV `nome,caminho`; caminhos relativos partem da pasta do manifesto."""
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline='', encoding='utf-8') as manifest:
+        return [(row[0], os.path.join(base, row[1])) for row in csv.reader(manifest) if len(row) >= 2]
+
+
+def aggregate_embeddings(embeddings, method='mean'):
+    """Combina vários embeddings de uma pessoa pela média normalizada ou pelo medoide."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if len(embeddings) == 1:
+        return embeddings[0]
+    if method == 'medoid':
+        # Embedding com a menor soma de distâncias aos demais (robusto a fotos ruins)
+        sq = np.einsum('ij,ij->i', embeddings, embeddings)
+        d2 = np.maximum(sq[:, None] - 2.0 * embeddings @ embeddings.T + sq[None, :], 0.0)
+        return embeddings[np.argmin(np.sqrt(d2).sum(axis=1))]
+    mean = embeddings.mean(axis=0)
+    return mean / max(np.linalg.norm(mean), 1e-12)
+
+
+class BulkEnroller:
+    """Cadastra muitas imagens: decodifica em threads e roda as redes em lotes.
+
+    Os hashes (SHA-1 do arquivo) das imagens já cadastradas ficam em
+    `hashes.tsv` na pasta da galeria persistente, quando houver uma, e são
+    usados para pular imagens repetidas entre execuções.
+    """
+
+    def __init__(self, recognizer, aggregate='mean', batch_size=64, decode_threads=8):
+        self.recognizer = recognizer
+        self.aggregate = aggregate
+        self.batch_size = batch_size
+        self.decode_threads = decode_threads
+        self.hashes = {}  # hash -> nome
+        self._hash_path = None
+        if recognizer.store is not None:
+            self._hash_path = os.path.join(recognizer.store.path, HASHES_FILE)
+            if os.path.exists(self._hash_path):
+                with open(self._hash_path, encoding='utf-8') as hashes:
+                    for line in hashes:
+                        digest, _, name = line.rstrip('\n').partition('\t')
+                        if digest:
+                            self.hashes[digest] = name
+
+    def _load(self, entry):
+        """Lê o arquivo, calcula o hash e só decodifica imagens ainda não cadastradas."""
+        name, path = entry
+        try:
+            with open(path, 'rb') as image_file:
+                data = image_file.read()
+        except OSError as e:
+            return name, path, None, None, f"não foi possível ler: {e}"
+        digest = hashlib.sha1(data).hexdigest()
+        if digest in self.hashes:
+            return name, path, digest, None, None
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return name, path, digest, None, "imagem inválida"
+        return name, path, digest, image, None
+
+    def enroll(self, entries):
+        """Cadastra a lista de (nome, caminho) e retorna um relatório com vazão e falhas."""
+        start = time.perf_counter()
+        collected = {}  # nome -> [embeddings]
+        new_hashes = []
+        failures = []
+        skipped = 0
+        seen = set()
+
+        with ThreadPoolExecutor(self.decode_threads) as pool:
+            for i in range(0, len(entries), self.batch_size):
+                loaded = list(pool.map(self._load, entries[i:i + self.batch_size]))
+                batch = []
+                for name, path, digest, image, error in loaded:
+                    if error:
+                        failures.append((path, error))
+                    elif image is None or digest in seen:
+                        skipped += 1
+                    else:
+                        seen.add(digest)
+                        batch.append((name, path, digest, image))
+                if not batch:
+                    continue
+
+                faces = self.recognizer.detect_best_faces([image for _, _, _, image in batch])
+                found = [(item, face) for item, face in zip(batch, faces) if face is not None]
+                failures += [(path, "nenhum rosto encontrado") for (_, path, _, _), face in zip(batch, faces) if face is None]
+                if not found:
+                    continue
+                embeddings = self.recognizer.embed_faces([face for _, face in found])
+                for ((name, _, digest, _), _), embedding in zip(found, embeddings):
+                    collected.setdefault(name, []).append(embedding)
+                    new_hashes.append((digest, name))
+
+        names, embeddings = [], []
+        previous_counts = Counter(self.hashes.values())
+        for name, person_embeddings in collected.items():
+            known = self.recognizer.known_faces.get(name)
+            if known is not None:
+                # Pessoa já cadastrada: na média o embedding atual pesa como as fotos antigas
+                weight = max(1, previous_counts[name]) if self.aggregate == 'mean' else 1
+                person_embeddings = [known['embedding']] * weight + person_embeddings
+            names.append(name)
+            embeddings.append(aggregate_embeddings(person_embeddings, self.aggregate))
+        if names:
+            self.recognizer.add_embeddings(names, embeddings)
+
+        self.hashes.update(new_hashes)
+        if self._hash_path is not None and new_hashes:
+            with open(self._hash_path, 'a', encoding='utf-8') as hashes:
+                for digest, name in new_hashes:
+                    hashes.write(f"{digest}\t{name}\n")
+
+        elapsed = time.perf_counter() - start
+        return {
+            'images': len(entries),
+            'enrolled_images': len(new_hashes),
+            'people': len(names),
+            'skipped': skipped,
+            'failures': failures,
+            'seconds': elapsed,
+            'images_per_second': len(entries) / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', help="diretório de fotos ou manifesto CSV (nome,caminho)")
+    parser.add_argument('--store', required=True, help="diretório da galeria persistente")
+    parser.add_argument('--aggregate', choices=['mean', 'medoid'], default='mean', help="como combinar várias fotos da mesma pessoa")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=8, help="threads de leitura e decodificação")
+    args = parser.parse_args()
+
+    entries = scan_directory(args.source) if os.path.isdir(args.source) else read_manifest(args.source)
+    recognizer = FaceRecognizer(store=GalleryStore(args.store))
+    report = BulkEnroller(recognizer, args.aggregate, args.batch_size, args.threads).enroll(entries)
+
+    for path, reason in report['failures']:
+        print(f"FALHA {path}: {reason}", file=sys.stderr)
+    print(f"{report['images']} imagens em {report['seconds']:.1f}s ({report['images_per_second']:.1f} imagens/s): "
+          f"{report['enrolled_images']} cadastradas para {report['people']} pessoas, "
+          f"{report['skipped']} já cadastradas, {len(report['failures'])} falhas")
+
+
+if __name__ == "__main__":
+    main()
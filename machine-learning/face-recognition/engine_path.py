@@ -0,0 +1,10 @@
+"""Torna o pacote face_engine (pasta na raiz do repositório) importável pelos scripts desta pasta.
+
+Basta `import engine_path` antes de importar o face_engine.
+"""
+import os
+import sys
+
+REPOSITORY_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if REPOSITORY_ROOT not in sys.path:
+    sys.path.insert(0, REPOSITORY_ROOT)
@@ -1,111 +1,105 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog
+import os
 import cv2
-import numpy as np
 import threading
 import time
-from PIL import Image, ImageTk
-
-# --- Configurações dos Modelos ---
-MODEL_DIR = './models/'
-# Modelos para detecção de rostos (SSD)
-PROTOTXT_PATH = MODEL_DIR + 'deploy.prototxt'
-MODEL_PATH = MODEL_DIR + 'res10_300x300_ssd_iter_140000.caffemodel'
-# Modelo para extração de embeddings (OpenFace)
-EMBEDDING_MODEL_PATH = MODEL_DIR + 'nn4.small2.v1.t7'
-CONFIDENCE_THRESHOLD = 0.5
-
-# --- Classes para a Lógica de Reconhecimento ---
-
-class FaceRecognizer:
-    def __init__(self):
-        # Carrega o detector de faces
-        self.detector = cv2.dnn.readNetFromCaffe(PROTOTXT_PATH, MODEL_PATH)
-        # Carrega o modelo de embeddings para reconhecimento
-        self.embedder = cv2.dnn.readNetFromTorch(EMBEDDING_MODEL_PATH)
-        self.known_faces = {}
-
-    def add_known_face(self, name, image_path):
-        """Adiciona uma pessoa ao banco de dados."""
-        try:
-            image = cv2.imread(image_path)
-            (h, w) = image.shape[:2]
-            
-            # Detecção de rosto na imagem de referência
-            blob = cv2.dnn.blobFromImage(cv2.resize(image, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
-            self.detector.setInput(blob)
-            detections = self.detector.forward()
-            
-            if detections.shape[2] > 0 and detections[0, 0, 0, 2] > CONFIDENCE_THRESHOLD:
-                box = detections[0, 0, 0, 3:7] * np.array([w, h, w, h])
-                (startX, startY, endX, endY) = box.astype("int")
-                
-                face = image[startY:endY, startX:endX]
-                face_blob = cv2.dnn.blobFromImage(face, 1.0 / 255, (96, 96), (0, 0, 0), swapRB=True, crop=False)
-                self.embedder.setInput(face_blob)
-                embedding = self.embedder.forward().flatten()
-                
-                self.known_faces[name] = {'embedding': embedding, 'appearances': 0, 'screen_time': 0}
-                return True
-        except Exception as e:
-            messagebox.showerror("Erro", f"Não foi possível adicionar a pessoa {name}: {e}")
-            return False
-        return False
-
-    def recognize_face(self, frame):
-        """Detecta e reconhece rostos em um quadro."""
-        (h, w) = frame.shape[:2]
-        blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
-        self.detector.setInput(blob)
-        detections = self.detector.forward()
-        
-        recognized_people = {}
-        for i in range(0, detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-            if confidence > CONFIDENCE_THRESHOLD:
-                box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                (startX, startY, endX, endY) = box.astype("int")
-                
-                face_roi = frame[startY:endY, startX:endX]
-                if face_roi.shape[0] < 20 or face_roi.shape[1] < 20:
-                    continue
-
-                face_blob = cv2.dnn.blobFromImage(face_roi, 1.0 / 255, (96, 96), (0, 0, 0), swapRB=True, crop=False)
-                self.embedder.setInput(face_blob)
-                embedding = self.embedder.forward().flatten()
-                
-                name = "Desconhecido"
-                min_dist = float('inf')
-                
-                for known_name, known_data in self.known_faces.items():
-                    dist = np.linalg.norm(known_data['embedding'] - embedding)
-                    if dist < min_dist:
-                        min_dist = dist
-                        name = known_name
-                
-                if min_dist > 0.8: # Limiar de similaridade (ajustável)
-                    name = "Desconhecido"
-                
-                if name not in recognized_people:
-                    recognized_people[name] = {'box': (startX, startY, endX, endY), 'embedding': embedding}
-
-        return recognized_people
+from functools import partial
+import engine_path  # noqa: F401
+from face_engine import (AnnotatedVideoWriter, EmbeddingCache, FaceRecognizer, FaceTracker, GalleryStore, Metrics, MotionGate,
+                         PresenceTracker, StartupReport, StreamReader, VideoPipeline, analyze_video, draw_metrics,
+                         draw_recognized_people, serve_metrics, start_metrics_logger)
+from face_engine.display import FrameDisplay
+
+# --- Configurações da Aplicação ---
+# Backend do cv2.dnn: 'opencv' ou 'openvino' (CPU)
+DNN_BACKEND = 'opencv'
+# Pipeline de vídeo: threads de inferência (cada uma com suas redes) e tamanho das filas
+INFERENCE_WORKERS = 1
+FRAME_QUEUE_SIZE = 4
+# Roda o detector a cada N quadros e rastreia os rostos entre eles (1 = todo quadro).
+# O rastreador precisa dos quadros em ordem, então com N > 1 há uma única thread de
+# inferência e INFERENCE_WORKERS é ignorado. Com N = 5 as redes rodam em 1 de cada 5
+# quadros, economia maior que a de mais workers; N = 1 com INFERENCE_WORKERS = 2 (ou
+# mais) detecta em todos os quadros, melhor para movimento rápido, usando mais núcleos.
+DETECTION_INTERVAL = 5
+# Diretório da galeria persistente (embeddings + metadados)
+GALLERY_DIR = './gallery/'
+# Cache de embeddings: tamanho, validade (s) e bits de diferença tolerados no hash do rosto
+EMBEDDING_CACHE_SIZE = 512
+EMBEDDING_CACHE_TTL = 2.0
+EMBEDDING_CACHE_TOLERANCE = 0
+# Filtro de movimento: pula a inferência se menos que essa fração da imagem mudou (0 = desligado)
+MOTION_THRESHOLD = 0.002
+# Detecção em blocos para câmeras de alta resolução: 'full' ou 'tiled'; com
+# ADAPTIVE_TILING só as regiões com movimento são divididas em blocos
+DETECTION_MODE = 'full'
+ADAPTIVE_TILING = True
+# Exibição: tamanho máximo da imagem na janela e taxa máxima de atualização (Hz)
+DISPLAY_MAX_SIZE = (960, 540)
+DISPLAY_REFRESH_HZ = 60
+# Métricas de latência por etapa: servidor local Prometheus (/metrics e /metrics.json;
+# porta 0 = desligado), linha JSON periódica no stderr (s; 0 = desligado) e sobreposição no vídeo
+METRICS_ENABLED = True
+METRICS_PORT = 0
+METRICS_LOG_INTERVAL = 0
+METRICS_OVERLAY = False
+# Fontes online (RTSP/HTTP): quadros guardados pelo leitor e tentativas de reconexão
+# seguidas antes de desistir (None = sem limite)
+STREAM_BUFFER_SIZE = 1
+STREAM_MAX_RETRIES = None
+# Gravação do vídeo anotado: diretório (None = desligado; um arquivo por sessão) e,
+# com RECORD_EVENTS_ONLY, só clipes curtos em torno de cada reconhecimento
+RECORD_DIR = None
+RECORD_EVENTS_ONLY = False
 
 # --- Interface Gráfica Tkinter ---
 
 class RecognitionApp:
-    def __init__(self, master):
+    def __init__(self, master, startup=None):
         self.master = master
         master.title("Reconhecimento de Faces em Vídeos")
+        self.startup = startup or StartupReport()
         
-        self.recognizer = FaceRecognizer()
+        self.metrics = Metrics(enabled=METRICS_ENABLED)
+        if METRICS_ENABLED and METRICS_PORT:
+            serve_metrics(self.metrics, METRICS_PORT)
+        if METRICS_ENABLED and METRICS_LOG_INTERVAL:
+            start_metrics_logger(self.metrics, METRICS_LOG_INTERVAL)
+        cache = EmbeddingCache(EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL, EMBEDDING_CACHE_TOLERANCE) if EMBEDDING_CACHE_SIZE > 0 else None
+        # Só a galeria é lida agora; as redes carregam em segundo plano com a janela já aberta
+        self.recognizer = FaceRecognizer(store=GalleryStore(GALLERY_DIR), cache=cache, backend=DNN_BACKEND,
+                                          detection_mode=DETECTION_MODE, lazy=True, metrics=self.metrics)
+        self.recognizer.load_in_background()
         self.video_processing_thread = None
+        self.pipeline = None
+        self.worker_recognizers = None
+        self.motion_gates = []
+        self.presence = None
+        self.recorder = None
         self.stop_flag = threading.Event()
         self.video_path_var = tk.StringVar()
 
         self.video_source_var = tk.StringVar(value="None")
         self.setup_ui()
 
+        # Pessoas já cadastradas em execuções anteriores
+        for name in self.recognizer.known_faces:
+            self.people_listbox.insert(tk.END, name)
+
+        master.after_idle(self.startup.mark, "janela visível")
+        self.report_startup()
+
+    def report_startup(self):
+        """Imprime o tempo de cada componente assim que as redes estiverem prontas."""
+        if not self.recognizer.ready.is_set():
+            self.master.after(100, self.report_startup)
+            return
+        self.startup.mark("redes prontas")
+        for component, seconds in self.recognizer.load_times.items():
+            self.startup.record(component, seconds)
+        print("Inicialização:\n" + self.startup.format())
+
     def setup_ui(self):
 
 
@@ -133,7 +127,8 @@ class RecognitionApp:
         self.people_listbox = tk.Listbox(people_frame, selectmode=tk.MULTIPLE)
         self.people_listbox.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
 
-        tk.Button(people_frame, text="Adicionar Pessoa", command=self.add_person).pack(side=tk.LEFT, padx=5)
+        self.add_person_button = tk.Button(people_frame, text="Adicionar Pessoa", command=self.add_person)
+        self.add_person_button.pack(side=tk.LEFT, padx=5)
         
         # Frame de botões de controle
         control_frame = tk.Frame(self.master, padx=10, pady=10)
@@ -159,6 +154,7 @@ class RecognitionApp:
         self.video_display_frame.pack(fill=tk.BOTH, expand=True)
         self.video_label = tk.Label(self.video_display_frame) # Onde o vídeo será mostrado
         self.video_label.pack()
+        self.display = FrameDisplay(self.video_label, DISPLAY_MAX_SIZE, DISPLAY_REFRESH_HZ)
 
     def on_radio_change(self, *args):
         """Função chamada quando um Radiobutton é selecionado."""
@@ -201,13 +197,74 @@ class RecognitionApp:
             # Se não for um número, usa como string (para arquivos/URLs)
             video_source = source
 
-        self.video_capture = cv2.VideoCapture(video_source)
+        self.video_capture = self.open_capture(video_source)
         if not self.video_capture.isOpened():
             messagebox.showerror("Erro", "Não foi possível abrir a fonte de vídeo.")
             return
             
+        self.start_pipeline()
+
+    def start_pipeline(self):
+        """Inicia as threads de captura e inferência e o consumidor da interface."""
+        if self.worker_recognizers is None:
+            # Cada thread de inferência precisa de suas próprias redes do cv2.dnn; as de
+            # self.recognizer ficam para o cadastro, que roda na thread do Tk
+            count = 1 if DETECTION_INTERVAL > 1 else INFERENCE_WORKERS
+            self.worker_recognizers = [self.recognizer.clone() for _ in range(count)]
+        if DETECTION_INTERVAL > 1:
+            # O rastreador precisa dos quadros em ordem: uma única thread de inferência
+            workers = [FaceTracker(self.worker_recognizers[0], DETECTION_INTERVAL)]
+        else:
+            workers = self.worker_recognizers
+
+        if MOTION_THRESHOLD > 0:
+            # Câmeras paradas: reaproveita o último resultado enquanto nada se mover
+            self.motion_gates = [MotionGate(recognizer, MOTION_THRESHOLD, adaptive_tiling=ADAPTIVE_TILING) for recognizer in workers]
+            workers = self.motion_gates
+
+        # Fontes ao vivo podem descartar quadros; arquivos são processados por inteiro
+        mirror = self.video_source_var.get() == 'camera'
+        live = self.video_source_var.get() in ('camera', 'online')
+        processors = [partial(self.process_frame, recognizer, mirror) for recognizer in workers]
+        # Tempo de tela pelo tempo dos quadros no vídeo, não pelo relógio nem pela ordem de processamento
+        fps = self.video_capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.presence = PresenceTracker(duration=1 / fps)
+        record = None
+        if RECORD_DIR:
+            # A codificação roda em outra thread; o pipeline entrega os quadros já na ordem do vídeo
+            path = os.path.join(RECORD_DIR, time.strftime('%Y%m%d_%H%M%S') + '.mp4')
+            self.recorder = AnnotatedVideoWriter(path, fps, events_only=RECORD_EVENTS_ONLY)
+            record = partial(self.record_frame, self.recorder)
+        self.pipeline = VideoPipeline(self.video_capture, processors, self.stop_flag, live=live, queue_size=FRAME_QUEUE_SIZE,
+                                      metrics=self.metrics, with_timestamps=True, ordered_sink=record)
+        self.pipeline.start()
+        # A galeria é compartilhada com os workers: nada de cadastro enquanto eles buscam nela
+        self.add_person_button.config(state=tk.DISABLED)
         self.update_video_feed()
 
+    def process_frame(self, recognizer, mirror, frame, timestamp):
+        """Executado nas threads de inferência: reconhece, registra a presença e desenha no quadro.
+
+        Retorna (quadro anotado, pessoas reconhecidas).
+        """
+        # Inverte o frame se for da câmera (efeito espelho)
+        if mirror:
+            frame = cv2.flip(frame, 1)
+
+        recognized_people = recognizer.recognize_face(frame)
+        self.presence.observe(timestamp, recognized_people)
+        draw_recognized_people(frame, recognized_people)
+        if METRICS_OVERLAY:
+            draw_metrics(frame, self.metrics)
+        # A conversão para o Tk fica na exibição, já no tamanho da janela
+        return frame, recognized_people
+
+    @staticmethod
+    def record_frame(recorder, timestamp, result):
+        """ordered_sink do pipeline: grava os quadros anotados na ordem da captura."""
+        frame, recognized_people = result
+        recorder.write(frame, recognized_people, timestamp)
+
     def add_person(self):
         name = tk.simpledialog.askstring("Adicionar Pessoa", "Nome da Pessoa:")
         if name:
@@ -215,9 +272,11 @@ class RecognitionApp:
             if image_path:
                 if self.recognizer.add_known_face(name, image_path):
                     self.people_listbox.insert(tk.END, name)
+                else:
+                    messagebox.showerror("Erro", f"Não foi possível adicionar a pessoa {name}.")
     
     def start_recognition(self):
-        if hasattr(self, 'video_capture') and self.video_capture.isOpened():
+        if self.pipeline is not None:
             messagebox.showinfo("Aviso", "O reconhecimento já está em andamento.")
             return
 
@@ -243,21 +302,60 @@ class RecognitionApp:
 
         self.stop_flag.clear()
 
-        self.video_capture = cv2.VideoCapture(source)
+        self.video_capture = self.open_capture(source)
         if not self.video_capture.isOpened():
             messagebox.showerror("Erro", f"Não foi possível abrir a fonte de vídeo '{video_source}'.")
             return
 
-        self.update_video_feed()
+        self.start_pipeline()
+
+    def open_capture(self, source):
+        """VideoCapture para câmeras e arquivos; StreamReader para URLs.
+
+        O StreamReader conecta e decodifica em sua própria thread, então uma
+        rede lenta não trava a interface e uma queda de conexão é seguida de
+        novas tentativas em vez de encerrar o reconhecimento.
+        """
+        if self.video_source_var.get() == 'online':
+            return StreamReader(source, STREAM_BUFFER_SIZE, max_retries=STREAM_MAX_RETRIES, stop_flag=self.stop_flag)
+        return cv2.VideoCapture(source)
         
     def stop_recognition(self):
         self.stop_flag.set()
-        if hasattr(self, 'video_capture') and self.video_capture.isOpened():
-            self.video_capture.release()
-            self.video_label.config(image='') 
+        if self.pipeline is not None:
+            # A thread de captura libera o VideoCapture ao sair
+            self.pipeline.join(timeout=1.0)
+            self.enable_enrollment(self.pipeline)
+            self.pipeline = None
+            # O pipeline guarda sua própria referência ao gravador, e write() depois de
+            # close() só é ignorado: um worker que não terminou no join não quebra
+            recorder, self.recorder = self.recorder, None
+            if recorder is not None:
+                # O fim da codificação não trava a interface; avisa quando o arquivo estiver pronto
+                recorder.close(wait=False)
+                self.report_recording(recorder)
+            self.add_results(self.presence.results())
+            self.display.clear()
             messagebox.showinfo("Finalizado", "Reconhecimento finalizado.")
             self.show_results() 
 
+    def report_recording(self, recorder):
+        if not recorder.finished:
+            self.master.after(200, self.report_recording, recorder)
+            return
+        stats = recorder.stats()
+        saved = f"{stats['clips']} clipes em {os.path.dirname(recorder.path)}" if recorder.events_only else recorder.path
+        self.process_control_text.config(state=tk.NORMAL)
+        self.process_control_text.insert(tk.END, f"\nGravação finalizada: {saved} ({stats['written']} quadros, {stats['dropped']} descartados)")
+        self.process_control_text.config(state=tk.DISABLED)
+
+    def enable_enrollment(self, pipeline):
+        """Reativa o cadastro só quando nenhum worker daquele pipeline estiver mais buscando na galeria."""
+        if pipeline.running:
+            self.master.after(100, self.enable_enrollment, pipeline)
+            return
+        self.add_person_button.config(state=tk.NORMAL)
+
     def show_results(self):
         self.results_text.config(state=tk.NORMAL)
         self.results_text.delete(1.0, tk.END)
@@ -270,83 +368,65 @@ class RecognitionApp:
 
 
     def process_video(self, video_source):
-        cap = cv2.VideoCapture(video_source)
-        if not cap.isOpened():
+        """Processa o vídeo sem exibir quadros e acumula os resultados no banco de dados."""
+        try:
+            results, _ = analyze_video(self.recognizer, video_source, self.stop_flag)
+        except IOError:
             messagebox.showerror("Erro", "Não foi possível abrir a fonte de vídeo. Verifique o caminho ou URL.")
             return
 
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        
-        while not self.stop_flag.is_set():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Lógica de reconhecimento
-            recognized_people = self.recognizer.recognize_face(frame)
-            
-            # Atualiza contadores
-            for name, data in self.recognizer.known_faces.items():
-                if name in recognized_people:
-                    # A pessoa apareceu neste frame, atualiza o tempo e a contagem
-                    data['screen_time'] += 1/fps
-                    if data['appearances'] == 0 or (data['appearances'] > 0 and (time.time() - data['last_seen_time']) > 1): # Lógica simplista para aparições
-                        data['appearances'] += 1
-                        data['last_seen_time'] = time.time()
-                
-        cap.release()
+        self.add_results(results)
+
+    def add_results(self, results):
+        """Soma o tempo de tela e as aparições de uma sessão aos contadores de cada pessoa."""
+        for name, data in results.items():
+            if name in self.recognizer.known_faces:
+                self.recognizer.known_faces[name]['screen_time'] += data['screen_time']
+                self.recognizer.known_faces[name]['appearances'] += data['appearances']
 
     def update_video_feed(self):
-        """Captura um frame, realiza o reconhecimento de face e exibe na tela."""
-        if self.stop_flag.is_set():
+        """Exibe o resultado mais recente do pipeline e as estatísticas de processamento."""
+        if self.stop_flag.is_set() or self.pipeline is None:
             return
 
-        ret, frame = self.video_capture.read()
-        if not ret:
-            # Se o vídeo terminou ou a câmera foi desconectada
+        # Só repinta (e atualiza as estatísticas) quando há um resultado novo
+        start = time.perf_counter()
+        result = self.pipeline.latest()
+        if self.display.show(result[0] if result is not None else None):
+            if self.metrics.enabled:
+                self.metrics.record('display', time.perf_counter() - start)
+            self.show_pipeline_stats()
+
+        if self.pipeline.finished and not self.display.pending:
+            # Se o vídeo terminou ou a câmera foi desconectada (e o último quadro já foi pintado)
             self.stop_recognition()
             return
-        
-        # Inverte o frame se for da câmera (efeito espelho)
-        if self.video_source_var.get() == 'camera':
-            frame = cv2.flip(frame, 1)
-
-        # Chama a função de reconhecimento de faces que você já criou
-        recognized_people = self.recognizer.recognize_face(frame)
-        
-        # Itera sobre as pessoas reconhecidas para desenhar as caixas
-        for name, data in recognized_people.items():
-            (startX, startY, endX, endY) = data['box']
-            
-            # Define a cor e o texto do rótulo
-            color = (0, 255, 0) if name != "Desconhecido" else (0, 0, 255)
-            label = f"{name}"
-            
-            # Desenha a caixa delimitadora
-            cv2.rectangle(frame, (startX, startY), (endX, endY), color, 2)
-            
-            # Prepara o fundo para o texto
-            y = startY - 15 if startY - 15 > 15 else startY + 15
-            
-            # Desenha o texto do rótulo
-            cv2.putText(frame, label, (startX, y), cv2.FONT_HERSHEY_SIMPLEX, 0.75, color, 2)
-
-        # Converte o frame do OpenCV (BGR) para o formato do Pillow (RGB)
-        cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Converte para um objeto de imagem do Tkinter
-        img = Image.fromarray(cv2image)
-        imgtk = ImageTk.PhotoImage(image=img)
-        
-        # Atualiza o Label do vídeo na interface
-        self.video_label.imgtk = imgtk
-        self.video_label.configure(image=imgtk)
 
-        # Chama esta função novamente após um curto intervalo de tempo
-        self.master.after(15, self.update_video_feed)
+        # Chama esta função novamente no ritmo da taxa de atualização da tela
+        self.master.after(self.display.interval_ms, self.update_video_feed)
+
+    def show_pipeline_stats(self):
+        stats = self.pipeline.stats()
+        self.process_control_text.config(state=tk.NORMAL)
+        self.process_control_text.delete(1.0, tk.END)
+        self.process_control_text.insert(tk.END, f"FPS: {stats['fps']:.1f} | Fila de quadros: {stats['frames_queue']} | Fila de resultados: {stats['results_queue']}\n")
+        self.process_control_text.insert(tk.END, f"Capturados: {stats['captured']} | Processados: {stats['processed']} | Descartados: {stats['dropped']}")
+        cache_stats = self.recognizer.cache_stats()
+        if cache_stats is not None:
+            self.process_control_text.insert(tk.END, f" | Cache de embeddings: {cache_stats['hits']} acertos, {cache_stats['misses']} faltas")
+        if self.motion_gates:
+            frames = sum(gate.frames for gate in self.motion_gates)
+            gated = sum(gate.gated_frames for gate in self.motion_gates)
+            self.process_control_text.insert(tk.END, f" | Sem movimento: {100.0 * gated / max(frames, 1):.0f}% dos quadros")
+        if isinstance(self.video_capture, StreamReader):
+            stream_stats = self.video_capture.stats()
+            self.process_control_text.insert(tk.END, f"\nConexão: {stream_stats['state']} | Reconexões: {stream_stats['reconnects']}"
+                                                     f" | Tempo do quadro: {self.pipeline.latest_timestamp or 0.0:.1f}s")
+        self.process_control_text.config(state=tk.DISABLED)
         
 # --- Inicialização da Aplicação ---
 if __name__ == "__main__":
+    startup = StartupReport()
     root = tk.Tk()
-    app = RecognitionApp(root)
+    app = RecognitionApp(root, startup)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""Reconhecimento em várias câmeras ao mesmo tempo, com um único conjunto de redes.
+
+Cada fonte (índice de câmera, URL ou arquivo) tem sua thread de leitura; o
+escalonador junta os quadros das câmeras em lotes para o detector e o modelo
+de embeddings, respeitando o FPS alvo de cada uma. Ao final grava, por
+câmera, o tempo de tela e as aparições de cada pessoa em JSON. Arquivos de
+vídeo são amostrados pelo próprio tempo do vídeo, no mesmo FPS alvo, sem
+perder quadros por estarem à frente.
+
+Uso:
+    python multi_stream.py 0 1 rtsp://cam3/stream --gallery FOTOS_DIR --fps 5 --duration 60
+"""
+import argparse
+import json
+import sys
+import time
+import engine_path  # noqa: F401
+from face_engine import FaceRecognizer, GalleryStore, Metrics, MultiStreamScheduler, load_gallery
+
+STATS_INTERVAL = 5.0 # Segundos entre os resumos de FPS por câmera
+
+
+def parse_source(source):
+    return int(source) if source.isdigit() else source
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sources', nargs='+', help="índices de câmera, URLs ou arquivos de vídeo")
+    gallery = parser.add_mutually_exclusive_group(required=True)
+    gallery.add_argument('--gallery', help="diretório com uma foto por pessoa (nome do arquivo = nome)")
+    gallery.add_argument('--gallery-store', help="galeria persistente já cadastrada (GalleryStore)")
+    parser.add_argument('--fps', type=float, default=5.0, help="quadros processados por segundo em cada câmera")
+    parser.add_argument('--batch', type=int, default=8, help="máximo de câmeras por passada das redes")
+    parser.add_argument('--workers', type=int, default=1, help="threads de inferência (cada uma com suas redes)")
+    parser.add_argument('--duration', type=float, default=0, help="segundos de execução (0 = até as fontes acabarem ou Ctrl+C)")
+    parser.add_argument('--output', help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    if args.gallery_store:
+        recognizer = FaceRecognizer(store=GalleryStore(args.gallery_store, readonly=True), max_batch_size=args.batch)
+    else:
+        recognizer = FaceRecognizer(max_batch_size=args.batch)
+        load_gallery(recognizer, args.gallery)
+
+    sources = {f"cam{i}": parse_source(source) for i, source in enumerate(args.sources)}
+    metrics = Metrics()
+    scheduler = MultiStreamScheduler(recognizer, sources, args.fps, args.batch, args.workers, metrics=metrics)
+    scheduler.start()
+    start = time.monotonic()
+    try:
+        while scheduler.running and (not args.duration or time.monotonic() - start < args.duration):
+            time.sleep(min(STATS_INTERVAL, args.duration or STATS_INTERVAL))
+            for name, stats in scheduler.stats().items():
+                print(f"{name} ({sources[name]}): {stats['fps']:.1f}/{stats['target_fps']:.1f} FPS, "
+                      f"{stats['processed']} processados, {stats['skipped']} pulados", file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+
+    results = {f"{name} ({sources[name]})": data for name, data in scheduler.results().items()}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2, ensure_ascii=False)
+    else:
+        json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Stream HTTP de teste a partir de um vídeo local, para exercitar o StreamReader.
+
+Serve o arquivo em tempo real em http://HOST:PORT/NOME_DO_ARQUIVO e, com
+--drop-every, derruba as conexões periodicamente para simular uma câmera
+instável (a cada reconexão o vídeo recomeça do início). Com --check, lê o
+próprio stream pelo StreamReader por alguns segundos e mostra quadros lidos,
+descartados, reconexões e o tempo do último quadro. Um servidor RTSP (ex.: ffmpeg + mediamtx) serve igualmente: basta
+passar a URL dele para o app.
+
+Uso:
+    python stream_standin.py video.mp4 --port 8090 --drop-every 5
+    python stream_standin.py video.mp4 --check 20 --drop-every 5
+"""
+import argparse
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import engine_path  # noqa: F401
+from face_engine import StreamReader
+
+CHUNK_SIZE = 16384 # Bytes enviados por vez
+
+
+def serve(video_path, port, drop_every=0.0, host='127.0.0.1'):
+    """Inicia o servidor em uma thread daemon e retorna o servidor.
+
+    O arquivo é enviado no ritmo de reprodução (bytes/s = tamanho / duração),
+    como uma câmera que só produz quadros em tempo real.
+    """
+    capture = cv2.VideoCapture(video_path)
+    duration = capture.get(cv2.CAP_PROP_FRAME_COUNT) / (capture.get(cv2.CAP_PROP_FPS) or 25.0)
+    capture.release()
+    size = os.path.getsize(video_path)
+    rate = size / max(duration, 1e-3)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/' + os.path.basename(video_path):
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(size))
+            self.end_headers()
+
+            connected = time.monotonic()
+            sent = 0
+            try:
+                with open(video_path, 'rb') as video:
+                    while not drop_every or time.monotonic() - connected < drop_every:
+                        data = video.read(CHUNK_SIZE)
+                        if not data:
+                            break
+                        self.wfile.write(data)
+                        sent += len(data)
+                        # Não adianta o envio além do tempo real
+                        time.sleep(max(0.0, sent / rate - (time.monotonic() - connected)))
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='stream-standin', daemon=True).start()
+    return server
+
+
+def check(url, seconds):
+    reader = StreamReader(url, initial_delay=0.2, max_delay=2.0)
+    start = time.monotonic()
+    frames = 0
+    while time.monotonic() - start < seconds:
+        ret, _ = reader.read(timeout=0.5)
+        if ret:
+            frames += 1
+            # Simula uma inferência mais lenta que o stream
+            time.sleep(0.05)
+    print(f"consumidos: {frames} | tempo do último quadro: {reader.get(cv2.CAP_PROP_POS_MSEC) / 1000.0:.1f}s | {reader.stats()}")
+    reader.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('video', help="arquivo de vídeo servido")
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--drop-every', type=float, default=0, help="derruba cada conexão após N segundos (0 = nunca)")
+    parser.add_argument('--check', type=float, default=0, help="lê o stream pelo StreamReader por N segundos e sai")
+    args = parser.parse_args()
+
+    server = serve(args.video, args.port, args.drop_every)
+    url = f"http://127.0.0.1:{args.port}/{os.path.basename(args.video)}"
+    if args.check:
+        check(url, args.check)
+        server.shutdown()
+        return
+    print(f"Servindo {args.video} em {url} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
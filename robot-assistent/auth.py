@@ -0,0 +1,203 @@
+import queue
+import threading
+import time
+import cv2
+
+# --- Estados e Transições da Autenticação ---
+VOICE = "awaiting_hidden_voice"
+VOICE_OK = "voice_authenticated_idle"
+FACE = "awaiting_face"
+IRIS = "awaiting_iris"
+AUTHENTICATED = "authenticated"
+CLOSED = "idle"
+
+# (estado, evento) -> próximo estado; eventos fora da tabela são ignorados
+TRANSITIONS = {
+    (VOICE, 'voice_ok'): VOICE_OK,
+    (VOICE_OK, 'login'): FACE,
+    (VOICE_OK, 'timeout'): VOICE,
+    (FACE, 'face_ok'): IRIS,
+    (FACE, 'timeout'): VOICE_OK,
+    (FACE, 'failed'): VOICE_OK,
+    (IRIS, 'iris_ok'): AUTHENTICATED,
+    (IRIS, 'timeout'): VOICE_OK,
+}
+# Segundos máximos em cada etapa (estados ausentes não expiram)
+DEFAULT_TIMEOUTS = {VOICE_OK: 120.0, FACE: 20.0, IRIS: 20.0}
+
+# --- Máquina de Estados ---
+
+class AuthStateMachine:
+    """Fluxo voz -> rosto -> íris -> autenticado dirigido por uma fila de eventos.
+
+    post() pode ser chamado de qualquer thread (callback de áudio, worker do
+    rosto); process() consome a fila, verifica o prazo da etapa atual e
+    chama os callbacks de entrada/saída, sempre na thread que o chama (a do
+    Tk). Eventos que não valem para o estado atual, como um rosto reconhecido
+    depois do prazo, são descartados. O evento 'close' encerra de qualquer
+    estado.
+    """
+
+    def __init__(self, timeouts=None, initial=VOICE):
+        self.timeouts = DEFAULT_TIMEOUTS if timeouts is None else timeouts
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._state = None
+        self._initial = initial
+        self._deadline = None
+        self._on_enter = {}
+        self._on_exit = {}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def on_enter(self, state, callback):
+        """callback(evento, dados) ao entrar no estado."""
+        self._on_enter[state] = callback
+
+    def on_exit(self, state, callback):
+        """callback() ao sair do estado."""
+        self._on_exit[state] = callback
+
+    def start(self):
+        self._enter(self._initial, 'start', {})
+
+    def post(self, event, **data):
+        self._events.put((event, data))
+
+    def process(self):
+        """Aplica os eventos pendentes e os prazos vencidos; retorna o número de transições."""
+        transitions = 0
+        while True:
+            try:
+                event, data = self._events.get_nowait()
+            except queue.Empty:
+                break
+            transitions += self._handle(event, data)
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            transitions += self._handle('timeout', {})
+        return transitions
+
+    def _handle(self, event, data):
+        state = self.state
+        target = CLOSED if event == 'close' else TRANSITIONS.get((state, event))
+        if target is None or state == CLOSED:
+            return 0
+        callback = self._on_exit.get(state)
+        if callback is not None:
+            callback()
+        self._enter(target, event, data)
+        return 1
+
+    def _enter(self, state, event, data):
+        with self._lock:
+            self._state = state
+            timeout = self.timeouts.get(state)
+            self._deadline = time.monotonic() + timeout if timeout else None
+        callback = self._on_enter.get(state)
+        if callback is not None:
+            callback(event, data)
+
+
+# --- Reconhecimento Facial só Durante a Etapa do Rosto ---
+
+class FaceAuthWorker:
+    """Thread que abre a câmera, roda o reconhecimento e avisa quando o usuário aparece.
+
+    A câmera só é aberta em start() e liberada ao parar; `recognizer_factory`
+    é chamado dentro da thread, então carregar as redes não trava a interface.
+    `on_match(nome)` é chamado uma vez quando `target_name` é reconhecido e
+    `on_error(mensagem)` se a câmera não abrir. latest() devolve o último
+    quadro já anotado, para exibição. Com `recorder_factory(fps)` (ex.: um
+    AnnotatedVideoWriter) cada tentativa é gravada como evidência, sem
+    atrasar o reconhecimento.
+
+    Cada start() cria uma execução com seu próprio Event de parada, então
+    uma thread anterior que ainda não terminou nunca volta a rodar; a nova
+    espera (na própria thread) a anterior liberar a câmera. stop() só sinaliza
+    e retorna na hora, para não travar o Tk; join() espera o fim.
+    """
+
+    def __init__(self, recognizer_factory, target_name, on_match, on_error=None, camera_index=0, mirror=True,
+                 recorder_factory=None):
+        self.recognizer_factory = recognizer_factory
+        self.target_name = target_name.lower()
+        self.on_match = on_match
+        self.on_error = on_error
+        self.camera_index = camera_index
+        self.mirror = mirror
+        self.recorder_factory = recorder_factory
+        self._stop = None  # Event da execução atual
+        self._frame = None
+        self._frame_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self.stop()
+        previous = self._thread
+        self._stop = threading.Event()
+        with self._frame_lock:
+            self._frame = None
+        self._thread = threading.Thread(target=self._run, args=(self._stop, previous), name='face-auth', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    def join(self, timeout=None):
+        """Espera a execução atual terminar (e a gravação ser fechada)."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def latest(self):
+        with self._frame_lock:
+            return self._frame
+
+    def _run(self, stop, previous):
+        # A câmera só pode ser aberta de novo depois que a execução anterior a liberar
+        if previous is not None:
+            previous.join()
+        if stop.is_set():
+            return
+        capture = cv2.VideoCapture(self.camera_index)
+        recorder = None
+        try:
+            if not capture.isOpened():
+                if self.on_error and not stop.is_set():
+                    self.on_error("Não foi possível abrir a câmera.")
+                return
+            recognizer = self.recognizer_factory()
+            if self.recorder_factory is not None:
+                recorder = self.recorder_factory(capture.get(cv2.CAP_PROP_FPS) or 30.0)
+            matched = False
+            while not stop.is_set():
+                ret, frame = capture.read()
+                if not ret:
+                    time.sleep(0.01)
+                    continue
+                if self.mirror:
+                    frame = cv2.flip(frame, 1)
+
+                recognized_people = recognizer.recognize_face(frame)
+                for person in recognized_people:
+                    name = person['name']
+                    (startX, startY, endX, endY) = person['box']
+                    is_target = name.lower() == self.target_name
+                    color = (0, 255, 0) if is_target else (0, 0, 255)
+                    cv2.rectangle(frame, (startX, startY), (endX, endY), color, 2)
+                    cv2.putText(frame, name, (startX, startY - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+                    if is_target and not matched and not stop.is_set():
+                        matched = True
+                        self.on_match(name)
+                if recorder is not None:
+                    recorder.write(frame, recognized_people)
+                with self._frame_lock:
+                    if not stop.is_set():
+                        self._frame = frame
+        finally:
+            capture.release()
+            if recorder is not None:
+                recorder.close()
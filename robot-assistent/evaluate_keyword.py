@@ -0,0 +1,56 @@
+"""Avalia o detector de palavra-chave em gravações WAV.
+
+Espera três diretórios de WAV PCM 16 bits: modelos da palavra-chave,
+gravações em que ela é dita (positivos) e gravações sem ela (negativos).
+Mostra o tempo por trecho e as taxas de falsa aceitação e falsa rejeição
+para cada limiar.
+
+Uso:
+    python evaluate_keyword.py --templates keyword_templates/ --positive wav/barry/ --negative wav/outros/ --thresholds 0.7 0.9 1.1
+"""
+import argparse
+import os
+import time
+import numpy as np
+from keyword_spotting import KeywordSpotter, read_wav
+
+
+def load_dir(directory):
+    return [read_wav(os.path.join(directory, f)) for f in sorted(os.listdir(directory)) if f.lower().endswith('.wav')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--keyword', default='barry')
+    parser.add_argument('--templates', required=True)
+    parser.add_argument('--positive', required=True)
+    parser.add_argument('--negative', required=True)
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.7, 0.8, 0.9, 1.0, 1.1])
+    args = parser.parse_args()
+
+    spotter = KeywordSpotter(args.keyword)
+    print(f"{spotter.load_templates(args.templates)} modelos carregados")
+    positives, negatives = load_dir(args.positive), load_dir(args.negative)
+
+    # Os custos não dependem do limiar: calcula uma vez e varre os limiares
+    times = []
+    scores = {}
+    for label, recordings in (('positive', positives), ('negative', negatives)):
+        scores[label] = []
+        for samples, sample_rate in recordings:
+            start = time.perf_counter()
+            scores[label].append(spotter.score(samples, sample_rate))
+            times.append(1000.0 * (time.perf_counter() - start))
+    times = np.array(times)
+    print(f"{len(positives)} positivos, {len(negatives)} negativos; "
+          f"tempo por trecho: média {times.mean():.1f} ms, p95 {np.percentile(times, 95):.1f} ms")
+
+    print(f"{'limiar':>7} {'falsa aceitação':>16} {'falsa rejeição':>15}")
+    for threshold in args.thresholds:
+        far = np.mean(np.array(scores['negative']) <= threshold) if negatives else 0.0
+        frr = np.mean(np.array(scores['positive']) > threshold) if positives else 0.0
+        print(f"{threshold:>7.2f} {100 * far:>15.1f}% {100 * frr:>14.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import os
+import time
+import wave
+from collections import deque
+import numpy as np
+
+# --- Parâmetros do Áudio ---
+SAMPLE_RATE = 16000
+FRAME_MS = 25
+HOP_MS = 10
+N_MELS = 26
+N_MFCC = 13
+# VAD por energia: quadros acima do piso de ruído vezes VAD_RATIO contam como fala
+VAD_RATIO = 3.0
+VAD_MIN_RMS = 100.0 # Em amostras int16; abaixo disso é silêncio mesmo sem ruído de fundo
+MIN_SPEECH_MS = 150
+
+# --- Extração de Características (NumPy puro) ---
+
+def read_wav(path):
+    """Lê um WAV PCM 16 bits; retorna (amostras float32 mono, taxa de amostragem)."""
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: só WAV PCM de 16 bits é suportado")
+        data = np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2').astype(np.float32)
+        channels = wav.getnchannels()
+        if channels > 1:
+            data = data.reshape(-1, channels).mean(axis=1)
+        return data, wav.getframerate()
+
+
+def _frames(samples, sample_rate):
+    frame = int(sample_rate * FRAME_MS / 1000)
+    hop = int(sample_rate * HOP_MS / 1000)
+    if len(samples) < frame:
+        samples = np.pad(samples, (0, frame - len(samples)))
+    n = 1 + (len(samples) - frame) // hop
+    idx = np.arange(frame)[None, :] + hop * np.arange(n)[:, None]
+    return samples[idx]
+
+
+def speech_region(samples, sample_rate):
+    """Recorte com fala pela energia dos quadros (VAD), ou None se for só ruído."""
+    frames = _frames(samples, sample_rate)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    threshold = max(VAD_MIN_RMS, VAD_RATIO * np.percentile(rms, 10))
+    voiced = np.nonzero(rms > threshold)[0]
+    hop = int(sample_rate * HOP_MS / 1000)
+    if len(voiced) == 0 or (voiced[-1] - voiced[0] + 1) * HOP_MS < MIN_SPEECH_MS:
+        return None
+    return samples[voiced[0] * hop:(voiced[-1] + 1) * hop + int(sample_rate * FRAME_MS / 1000)]
+
+
+def _mel_filterbank(sample_rate, n_fft):
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    mels = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), N_MELS + 2)
+    bins = np.floor((n_fft + 1) * 700.0 * (10 ** (mels / 2595.0) - 1) / sample_rate).astype(int)
+    bank = np.zeros((N_MELS, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, N_MELS + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            bank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            bank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return bank
+
+
+def mfcc(samples, sample_rate=SAMPLE_RATE):
+    """MFCCs (quadros x N_MFCC) normalizados por média e variância."""
+    samples = np.append(samples[0], samples[1:] - 0.97 * samples[:-1])
+    frames = _frames(samples, sample_rate) * np.hamming(int(sample_rate * FRAME_MS / 1000))
+    n_fft = 1 << (frames.shape[1] - 1).bit_length()
+    power = np.abs(np.fft.rfft(frames, n_fft)) ** 2 / n_fft
+    energies = np.log(np.maximum(power @ _mel_filterbank(sample_rate, n_fft).T, 1e-10))
+    # DCT-II das energias log-mel
+    k = np.arange(N_MFCC)[:, None]
+    dct = np.cos(np.pi * k * (2 * np.arange(N_MELS)[None, :] + 1) / (2 * N_MELS))
+    features = energies @ dct.T
+    return (features - features.mean(axis=0)) / (features.std(axis=0) + 1e-8)
+
+
+def dtw_distance(a, b):
+    """Custo DTW entre duas sequências de MFCCs, normalizado pelo tamanho.
+
+    Cada linha da matriz é resolvida de uma vez: o passo horizontal vira um
+    mínimo acumulado sobre a soma acumulada dos custos da linha.
+    """
+    cost = np.sqrt(np.maximum(np.sum(a ** 2, 1)[:, None] - 2 * a @ b.T + np.sum(b ** 2, 1)[None, :], 0.0))
+    previous = np.cumsum(cost[0])
+    for i in range(1, len(a)):
+        vertical = np.minimum(previous, np.concatenate([[np.inf], previous[:-1]])) + cost[i]
+        cumulative = np.cumsum(cost[i])
+        previous = cumulative + np.minimum.accumulate(vertical - cumulative)
+    return previous[-1] / (len(a) + len(b))
+
+
+# --- Detector da Palavra-chave ---
+
+class KeywordSpotter:
+    """Detecta uma palavra-chave localmente comparando o áudio com gravações modelo.
+
+    O VAD descarta trechos sem fala antes de qualquer cálculo; o trecho com
+    fala é comparado por DTW com os MFCCs de cada modelo. Custos até
+    `threshold` aceitam; até `threshold * ambiguous_ratio` o `fallback`
+    (opcional, ex.: um reconhecedor offline) decide recebendo o áudio e
+    devolvendo o texto; acima disso rejeita sem chamar nada.
+    """
+
+    def __init__(self, keyword, threshold=0.9, ambiguous_ratio=1.3, fallback=None):
+        self.keyword = keyword.lower()
+        self.threshold = threshold
+        self.ambiguous_ratio = ambiguous_ratio
+        self.fallback = fallback
+        self.templates = []
+        self.chunks = 0
+        self.fallback_calls = 0
+        self._times = deque(maxlen=1000)
+
+    def add_template(self, samples, sample_rate=SAMPLE_RATE):
+        region = speech_region(samples, sample_rate)
+        if region is None:
+            return False
+        self.templates.append(mfcc(region, sample_rate))
+        return True
+
+    def load_templates(self, directory):
+        """Carrega todos os WAV do diretório como modelos; retorna quantos foram usados."""
+        if not os.path.isdir(directory):
+            return 0
+        loaded = 0
+        for file_name in sorted(os.listdir(directory)):
+            if file_name.lower().endswith('.wav'):
+                loaded += self.add_template(*read_wav(os.path.join(directory, file_name)))
+        return loaded
+
+    def score(self, samples, sample_rate=SAMPLE_RATE):
+        """Menor custo DTW entre o trecho com fala e os modelos (inf se não houver fala)."""
+        region = speech_region(samples, sample_rate)
+        if region is None or not self.templates:
+            return float('inf')
+        features = mfcc(region, sample_rate)
+        return min(dtw_distance(features, template) for template in self.templates)
+
+    def detect(self, samples, sample_rate=SAMPLE_RATE, audio=None):
+        """True se a palavra-chave foi dita; `audio` é repassado ao fallback."""
+        start = time.perf_counter()
+        try:
+            score = self.score(samples, sample_rate)
+            if score <= self.threshold:
+                return True
+            if self.fallback is not None and score <= self.threshold * self.ambiguous_ratio:
+                self.fallback_calls += 1
+                text = self.fallback(audio if audio is not None else (samples, sample_rate))
+                return bool(text) and self.keyword in text.lower()
+            return False
+        finally:
+            self.chunks += 1
+            self._times.append(time.perf_counter() - start)
+
+    def process(self, audio):
+        """Versão para o AudioData do speech_recognition (listen_in_background)."""
+        raw = audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2)
+        samples = np.frombuffer(raw, dtype='<i2').astype(np.float32)
+        return self.detect(samples, SAMPLE_RATE, audio)
+
+    def stats(self):
+        """Trechos analisados, chamadas ao fallback e tempo por trecho (ms)."""
+        times = np.array(self._times) * 1000.0
+        return {
+            'chunks': self.chunks,
+            'fallback_calls': self.fallback_calls,
+            'mean_ms': float(times.mean()) if len(times) else 0.0,
+            'p95_ms': float(np.percentile(times, 95)) if len(times) else 0.0,
+        }
@@ -1,129 +1,91 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import cv2
-from PIL import Image, ImageTk
-import speech_recognition as sr
+from tkinter import ttk
+import os
 import threading
-import pyttsx3
 from datetime import datetime
-import numpy as np
+from auth import AUTHENTICATED, FACE, IRIS, VOICE, VOICE_OK, AuthStateMachine, FaceAuthWorker
+from keyword_spotting import KeywordSpotter
+from speech import PRIORITY_HIGH, SpeechWorker
+import engine_path  # noqa: F401
+from face_engine import AnnotatedVideoWriter, FaceRecognizer, GalleryStore, MotionGate, StartupReport
+from face_engine.display import FrameDisplay
 
 # --- Configurações dos Modelos ---
 MODEL_DIR = './models/'
-PROTOTXT_PATH = MODEL_DIR + 'deploy.prototxt'
-MODEL_PATH = MODEL_DIR + 'res10_300x300_ssd_iter_140000.caffemodel'
-EMBEDDING_MODEL_PATH = MODEL_DIR + 'nn4.small2.v1.t7'
-CONFIDENCE_THRESHOLD = 0.5
+DNN_BACKEND = 'opencv' # 'opencv' ou 'openvino'
+GALLERY_DIR = './gallery/' # Galeria persistente com os embeddings cadastrados
+MOTION_THRESHOLD = 0.002 # Fração mínima da imagem que precisa mudar para rodar a detecção (0 = sempre roda)
+# Quadros parados seguidos que reaproveitam o último resultado antes de rodar a detecção de novo: um
+# primeiro quadro escuro ou borrado não pode valer até o fim do prazo com o usuário imóvel
+MOTION_MAX_GATED_FRAMES = 10
 
-# --- Classes para a Lógica de Reconhecimento ---
+# --- Configurações de Fala ---
+# Frases fixas sintetizadas uma única vez e depois só tocadas
+FIXED_PHRASES = (
+    "Hello, What's your name?",
+    "Please, look at the camera for facial recognition.",
+    "Facial recognition complete. Preparing for iris scan.",
+)
+PROMPT_MAX_AGE = 5.0 # Segundos que um aviso pode esperar na fila antes de ficar velho
 
-class FaceRecognizer:
-    def __init__(self):
-        self.detector = cv2.dnn.readNetFromCaffe(PROTOTXT_PATH, MODEL_PATH)
-        self.embedder = cv2.dnn.readNetFromTorch(EMBEDDING_MODEL_PATH)
-        self.known_faces = {}
+# --- Palavra-chave da Etapa de Voz ---
+KEYWORD = "barry"
+KEYWORD_TEMPLATES_DIR = './keyword_templates/' # Gravações WAV da palavra-chave (sem elas usa o Google)
+KEYWORD_THRESHOLD = 0.9 # Custo DTW máximo para aceitar (calibre com evaluate_keyword.py)
+KEYWORD_FALLBACK = 'sphinx' # Reconhecedor offline para casos duvidosos: 'sphinx' ou None
 
-    def add_known_face(self, name, image_path):
-        """Adiciona uma pessoa ao banco de dados a partir de um arquivo de imagem."""
-        try:
-            image = cv2.imread(image_path)
-            if image is None:
-                messagebox.showerror("Erro", f"Não foi possível ler a imagem em: {image_path}")
-                return False
-            
-            (h, w) = image.shape[:2]
-            
-            blob = cv2.dnn.blobFromImage(cv2.resize(image, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
-            self.detector.setInput(blob)
-            detections = self.detector.forward()
-            
-            if detections.shape[2] > 0 and detections[0, 0, 0, 2] > CONFIDENCE_THRESHOLD:
-                box = detections[0, 0, 0, 3:7] * np.array([w, h, w, h])
-                (startX, startY, endX, endY) = box.astype("int")
-                
-                face = image[startY:endY, startX:endX]
-                face_blob = cv2.dnn.blobFromImage(face, 1.0 / 255, (96, 96), (0, 0, 0), swapRB=True, crop=False)
-                self.embedder.setInput(face_blob)
-                embedding = self.embedder.forward().flatten()
-                
-                self.known_faces[name.lower()] = {'embedding': embedding}
-                print(f"Usuário '{name}' adicionado ao banco de dados facial.")
-                return True
-        except Exception as e:
-            messagebox.showerror("Erro", f"Não foi possível adicionar a pessoa {name}: {e}")
-            return False
-        return False
-
-    def recognize_face(self, frame):
-        """Detecta e reconhece rostos em um quadro."""
-        (h, w) = frame.shape[:2]
-        blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
-        self.detector.setInput(blob)
-        detections = self.detector.forward()
-        
-        recognized_people = {}
-        for i in range(0, detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-            if confidence > CONFIDENCE_THRESHOLD:
-                box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                (startX, startY, endX, endY) = box.astype("int")
-                
-                face_roi = frame[startY:endY, startX:endX]
-                if face_roi.shape[0] < 20 or face_roi.shape[1] < 20: continue
-
-                face_blob = cv2.dnn.blobFromImage(face_roi, 1.0 / 255, (96, 96), (0, 0, 0), swapRB=True, crop=False)
-                self.embedder.setInput(face_blob)
-                embedding = self.embedder.forward().flatten()
-                
-                name = "Desconhecido"
-                min_dist = float('inf')
-                
-                for known_name, known_data in self.known_faces.items():
-                    dist = np.linalg.norm(known_data['embedding'] - embedding)
-                    if dist < min_dist:
-                        min_dist = dist
-                        name = known_name
-                
-                if min_dist > 0.8: name = "Desconhecido"
-                
-                recognized_people[name] = {'box': (startX, startY, endX, endY)}
-        return recognized_people
-    
+# --- Fluxo de Autenticação ---
+# Segundos máximos em cada etapa antes de voltar à anterior
+AUTH_TIMEOUTS = {VOICE_OK: 120.0, FACE: 20.0, IRIS: 20.0}
+EVENT_POLL_MS = 100 # Intervalo da fila de eventos (a única tarefa periódica com o assistente ocioso)
+VIDEO_REFRESH_HZ = 30 # Atualização máxima da imagem, só durante a etapa do rosto
+VIDEO_MAX_SIZE = (640, 480) # Tamanho máximo da imagem na janela
+AUTH_RECORDING_DIR = None # Diretório para gravar cada tentativa de reconhecimento facial (None = não grava)
 
 # Classe principal da nossa aplicação
 class AssistenteGUI:
-    def __init__(self, root):
+    def __init__(self, root, startup=None):
         self.root = root
         self.root.title("Assistente Virtual - Autenticação")
+        self.startup = startup or StartupReport()
 
         # --- Variáveis de Estado da Aplicação ---
-        self.face_recognizer = FaceRecognizer()
-        self.speech_recognizer = sr.Recognizer()
-        
-        # Máquina de estados para o novo fluxo
-        self.login_step = "awaiting_hidden_voice"
+        # Voz, redes e câmera carregam em segundo plano; a janela aparece antes
+        self.face_recognizer = None
+        self.motion_gate = None
+        self._recognizer_lock = threading.Lock()
+        self.sr = None # Módulo speech_recognition, importado em segundo plano
+        self.speech_recognizer = None
+        self.microphone = None
+        self.keyword_spotter = None
+        self.stop_listening = None
         self.authenticated_user = None
+        self.voice_ready = threading.Event()
+        self.models_ready = threading.Event()
+        self._startup_reported = False
 
         # --- Carregar Usuário Autorizado ---
         self.USER_NAME = "Diego"
         self.USER_IMAGE_PATH = r"C:\Users\bruna\Documents\Documentos pessoais\Foto concurso.jpeg"
-        self.face_recognizer.add_known_face(self.USER_NAME, self.USER_IMAGE_PATH)
-        
-        # --- Configurações de TTS e Câmera ---
-        self.tts_engine = pyttsx3.init()
-        voices = self.tts_engine.getProperty('voices')
-        self.tts_engine.setProperty('voice', voices[0].id)
-        self.video_capture = cv2.VideoCapture(0)
-        if not self.video_capture.isOpened():
-            messagebox.showerror("Erro", "Não foi possível abrir a câmera.")
-            return
 
-        # --- Configuração do Reconhecimento de Voz ---
-        self.microphone = sr.Microphone()
-        with self.microphone as source:
-            self.speech_recognizer.adjust_for_ambient_noise(source, duration=1)
-        self.stop_listening = self.speech_recognizer.listen_in_background(self.microphone, self._callback_audio)
-        print("Assistente pronto. Ouvindo em segundo plano...")
+        # --- Configurações de TTS ---
+        # O pyttsx3 é importado e iniciado na thread de fala
+        self.speech = SpeechWorker(voice_index=0, cached_phrases=FIXED_PHRASES)
+
+        # --- Máquina de Estados da Autenticação ---
+        self.auth = AuthStateMachine(AUTH_TIMEOUTS)
+        self.face_worker = FaceAuthWorker(self._get_face_recognizer, self.USER_NAME,
+                                          on_match=lambda name: self.auth.post('face_ok', name=name),
+                                          on_error=lambda message: self.auth.post('failed', message=message),
+                                          recorder_factory=self._create_recorder if AUTH_RECORDING_DIR else None)
+        self.auth.on_enter(VOICE, self._enter_voice)
+        self.auth.on_exit(VOICE, self._exit_voice)
+        self.auth.on_enter(VOICE_OK, self._enter_voice_ok)
+        self.auth.on_exit(VOICE_OK, lambda: self.login_button.config(state=tk.DISABLED))
+        self.auth.on_enter(FACE, self._enter_face)
+        self.auth.on_exit(FACE, self._exit_face)
+        self.auth.on_enter(IRIS, self._enter_iris)
+        self.auth.on_enter(AUTHENTICATED, self._enter_authenticated)
 
         # --- Estrutura da Interface (Tkinter) ---
         main_frame = ttk.Frame(self.root, padding="10")
@@ -138,43 +100,173 @@ class AssistenteGUI:
 
         self.video_label = ttk.Label(main_frame)
         self.video_label.grid(row=1, column=0, pady=10)
+        self.display = FrameDisplay(self.video_label, VIDEO_MAX_SIZE, VIDEO_REFRESH_HZ)
         
-        self.status_label = ttk.Label(main_frame, text="Aguardando...")
+        self.status_label = ttk.Label(main_frame, text="Carregando...")
         self.status_label.grid(row=2, column=0, pady=5, sticky="ew")
         
         # --- Iniciar os processos ---
-        self.update_video_feed()
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
-        
-        # Inicia a primeira etapa "oculta" da autenticação
-        self._falar_em_thread("Hello, What's your name?")
+        self.root.after_idle(self.startup.mark, "janela visível")
+        threading.Thread(target=self._load_in_background, name='startup', daemon=True).start()
+        self._process_events()
+
+    def _load_in_background(self):
+        """Prepara a voz primeiro (é a primeira etapa) e depois as redes do rosto."""
+        try:
+            with self.startup.measure("speech_recognition"):
+                import speech_recognition as sr
+                self.sr = sr
+                self.speech_recognizer = sr.Recognizer()
+                self.microphone = sr.Microphone()
+            with self.startup.measure("ruído ambiente"):
+                with self.microphone as source:
+                    self.speech_recognizer.adjust_for_ambient_noise(source, duration=1)
+            with self.startup.measure("palavra-chave"):
+                self.keyword_spotter = self._create_keyword_spotter()
+        finally:
+            self.voice_ready.set()
+        try:
+            self._load_face_recognizer()
+        finally:
+            self.models_ready.set()
+
+    def _load_face_recognizer(self):
+        """Carrega as redes e a galeria uma única vez (em segundo plano ou na thread do rosto)."""
+        with self._recognizer_lock:
+            if self.face_recognizer is None:
+                # Nomes cadastrados em minúsculas, para comparar com USER_NAME sem diferenciar caixa
+                recognizer = FaceRecognizer(store=GalleryStore(GALLERY_DIR), model_dir=MODEL_DIR,
+                                            backend=DNN_BACKEND, name_key=str.lower, lazy=True)
+                recognizer.load_models()
+                for component, seconds in recognizer.load_times.items():
+                    self.startup.record(component, seconds)
+                if self.USER_NAME.lower() not in recognizer.known_faces:
+                    with self.startup.measure("cadastro do usuário"):
+                        recognizer.add_known_face(self.USER_NAME, self.USER_IMAGE_PATH)
+                self.motion_gate = (MotionGate(recognizer, MOTION_THRESHOLD, max_gated_frames=MOTION_MAX_GATED_FRAMES)
+                                    if MOTION_THRESHOLD > 0 else None)
+                self.face_recognizer = recognizer
+
+    def _get_face_recognizer(self):
+        """Recognizer para a etapa do rosto (chamado na thread do rosto)."""
+        self._load_face_recognizer()
+        with self._recognizer_lock:
+            if self.motion_gate:
+                self.motion_gate.reset()
+            # Sem movimento na imagem, reaproveita o último resultado em vez de rodar as redes
+            return self.motion_gate or self.face_recognizer
+
+    def _create_recorder(self, fps):
+        """Gravador da tentativa atual (chamado na thread do rosto)."""
+        path = os.path.join(AUTH_RECORDING_DIR, datetime.now().strftime('%Y%m%d_%H%M%S') + '.mp4')
+        return AnnotatedVideoWriter(path, fps)
+
+    def _process_events(self):
+        """Aplica na thread do Tk os eventos vindos do áudio, do rosto e dos prazos."""
+        if self.auth.state is None and self.voice_ready.is_set():
+            # Inicia a primeira etapa "oculta" da autenticação assim que a voz estiver pronta
+            self.startup.mark("voz pronta")
+            self.auth.start()
+        if not self._startup_reported and self.models_ready.is_set():
+            self._startup_reported = True
+            self.startup.mark("redes prontas")
+            print("Inicialização:\n" + self.startup.format())
+        self.auth.process()
+        self.root.after(EVENT_POLL_MS, self._process_events)
 
     def start_login_process(self):
         """Inicia a sequência visível de autenticação (Rosto -> Íris)."""
-        if self.login_step == "voice_authenticated_idle":
-            self.login_step = "awaiting_face"
-            self.status_label.config(text="Olhe para a câmera para reconhecimento facial.")
-            self._falar_em_thread("Please, look at the camera for facial recognition.")
+        if self.auth.state == VOICE_OK:
+            self.auth.post('login')
+            self.auth.process()
         else:
             print("A etapa de voz ainda não foi concluída.")
 
+    # --- Entrada e Saída de Cada Etapa ---
+
+    def _enter_voice(self, event, data):
+        if self.microphone is None:
+            self.status_label.config(text="Microfone indisponível.")
+            return
+        # O microfone só fica aberto enquanto a etapa de voz espera a palavra-chave
+        self.stop_listening = self.speech_recognizer.listen_in_background(self.microphone, self._callback_audio)
+        print("Assistente pronto. Ouvindo em segundo plano...")
+        if event == 'start':
+            self._falar("Hello, What's your name?")
+        else:
+            self.status_label.config(text="Aguardando...")
+
+    def _exit_voice(self):
+        if self.stop_listening:
+            self.stop_listening(wait_for_stop=False)
+            self.stop_listening = None
+
+    def _enter_voice_ok(self, event, data):
+        self.login_button.config(state=tk.NORMAL) # HABILITA O BOTÃO
+        if event == 'voice_ok':
+            self.status_label.config(text=f"Olá, {self.USER_NAME}. Pressione o botão para continuar.")
+            self._falar(f"Hello, {self.USER_NAME}.")
+        elif event == 'failed':
+            self.status_label.config(text=data.get('message', "Falha no reconhecimento facial."))
+        else:
+            self.status_label.config(text="Tempo esgotado. Pressione o botão para tentar novamente.")
+
+    def _enter_face(self, event, data):
+        self.status_label.config(text="Olhe para a câmera para reconhecimento facial.")
+        self._falar("Please, look at the camera for facial recognition.")
+        self.face_worker.start()
+        self.update_video_feed()
+
+    def _exit_face(self):
+        self.face_worker.stop()
+        self.display.clear()
+
+    def _enter_iris(self, event, data):
+        self.status_label.config(text="Reconhecimento facial completo. Preparando leitura de íris...")
+        self._falar("Facial recognition complete. Preparing for iris scan.")
+        # --- PONTO PARA ADICIONAR A LÓGICA DA ÍRIS ---
+        # Como ainda não temos a íris, vamos autenticar diretamente
+        self.auth.post('iris_ok')
+
+    def _enter_authenticated(self, event, data):
+        self.authenticated_user = self.USER_NAME
+        self._ativar_assistente()
+
+    def _create_keyword_spotter(self):
+        """Detector local da palavra-chave, ou None se não houver gravações modelo."""
+        fallback = None
+        if KEYWORD_FALLBACK == 'sphinx':
+            def fallback(audio):
+                try:
+                    return self.speech_recognizer.recognize_sphinx(audio, keyword_entries=[(KEYWORD, 1e-20)])
+                except (self.sr.UnknownValueError, self.sr.RequestError):
+                    return None
+        spotter = KeywordSpotter(KEYWORD, KEYWORD_THRESHOLD, fallback=fallback)
+        if not spotter.load_templates(KEYWORD_TEMPLATES_DIR):
+            print(f"Nenhuma gravação em {KEYWORD_TEMPLATES_DIR}: a palavra-chave será verificada online.")
+            return None
+        return spotter
+
     def _callback_audio(self, recognizer, audio):
         """Processa a autenticação por voz 'oculta'."""
-        if self.login_step != "awaiting_hidden_voice":
+        if self.auth.state != VOICE:
             return
 
         try:
-            texto = recognizer.recognize_google(audio, language="pt-BR").lower()
-            print(f"Áudio detectado: '{texto}'")
-            
-            if "barry" in texto:
-                # Voz correta! Muda o estado e habilita o botão de login.
-                self.login_step = "voice_authenticated_idle"
-                self.status_label.config(text=f"Olá, {self.USER_NAME}. Pressione o botão para continuar.")
-                self.login_button.config(state=tk.NORMAL) # HABILITA O BOTÃO
-                self._falar_em_thread(f"Hello, {self.USER_NAME}.")
-        
-        except (sr.UnknownValueError, sr.RequestError):
+            if self.keyword_spotter is not None:
+                # Detecção local: sem ida à rede e sem reconhecer a frase inteira
+                detectado = self.keyword_spotter.process(audio)
+            else:
+                texto = recognizer.recognize_google(audio, language="pt-BR").lower()
+                print(f"Áudio detectado: '{texto}'")
+                detectado = KEYWORD in texto
+
+            if detectado:
+                # Voz correta! A thread do Tk muda o estado e habilita o botão de login.
+                self.auth.post('voice_ok')
+
+        except (self.sr.UnknownValueError, self.sr.RequestError):
             pass
 
     def _ativar_assistente(self):
@@ -186,63 +278,42 @@ class AssistenteGUI:
 
         texto_resposta = f"{saudacao}. Acesso liberado."
         self.status_label.config(text=texto_resposta)
-        self._falar_em_thread(texto_resposta)
+        # Sem key: a saudação não cancela o aviso do reconhecimento facial
+        self._falar(texto_resposta, key=None)
 
-    def _falar_em_thread(self, texto):
-        threading.Thread(target=self._falar, args=(texto,)).start()
-
-    def _falar(self, texto):
-        self.tts_engine.say(texto)
-        self.tts_engine.runAndWait()
+    def _falar(self, texto, key='login'):
+        """Enfileira a fala sem bloquear; um novo aviso do login substitui o anterior pendente."""
+        self.speech.say(texto, PRIORITY_HIGH, key=key, max_age=PROMPT_MAX_AGE)
 
     def update_video_feed(self):
-        """Exibe o vídeo e executa o reconhecimento facial quando solicitado."""
-        ret, frame = self.video_capture.read()
-        if not ret:
-            self.root.after(15, self.update_video_feed)
+        """Exibe o último quadro do worker do rosto enquanto a etapa estiver ativa."""
+        if self.auth.state != FACE:
             return
-
-        frame = cv2.flip(frame, 1)
-        
-        # Lógica de reconhecimento facial só é executada na etapa correta
-        if self.login_step == "awaiting_face":
-            recognized_people = self.face_recognizer.recognize_face(frame)
-            
-            for name, data in recognized_people.items():
-                (startX, startY, endX, endY) = data['box']
-                color = (0, 255, 0) if name.lower() == self.USER_NAME.lower() else (0, 0, 255)
-                cv2.rectangle(frame, (startX, startY), (endX, endY), color, 2)
-                cv2.putText(frame, name, (startX, startY - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-                
-                if name.lower() == self.USER_NAME.lower():
-                    # Rosto correto! Passa para a próxima etapa (Íris)
-                    self.login_step = "awaiting_iris" # Mude para "authenticated" se não houver íris
-                    self.status_label.config(text="Reconhecimento facial completo. Preparando leitura de íris...")
-                    self._falar_em_thread("Facial recognition complete. Preparing for iris scan.")
-                    
-                    # --- PONTO PARA ADICIONAR A LÓGICA DA ÍRIS ---
-                    # Como ainda não temos a íris, vamos autenticar diretamente
-                    self.authenticated_user = self.USER_NAME
-                    self.login_step = "authenticated"
-                    self._ativar_assistente()
-                    
-        cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(cv2image)
-        imgtk = ImageTk.PhotoImage(image=img)
-        self.video_label.imgtk = imgtk
-        self.video_label.configure(image=imgtk)
-
-        self.root.after(15, self.update_video_feed)
+        self.display.show(self.face_worker.latest())
+        self.root.after(self.display.interval_ms, self.update_video_feed)
 
     def on_closing(self):
         print("Fechando a aplicação...")
-        self.login_step = "idle"
-        if self.stop_listening:
-            self.stop_listening(wait_for_stop=False)
-        self.video_capture.release()
+        if self.motion_gate:
+            stats = self.motion_gate.stats()
+            print(f"Quadros sem movimento (inferência pulada): {stats['gated_frames']}/{stats['frames']} ({100.0 * stats['gated_fraction']:.0f}%)")
+        stats = self.speech.stats()
+        print(f"Falas: {stats['spoken']} (cache: {stats['cache_hits']}, unidas: {stats['coalesced']}, canceladas: {stats['cancelled']}), "
+              f"espera média {stats['queue_wait']['mean'] * 1000:.0f} ms, latência média {stats['latency']['mean'] * 1000:.0f} ms")
+        self.speech.close()
+        if self.keyword_spotter is not None:
+            stats = self.keyword_spotter.stats()
+            print(f"Palavra-chave: {stats['chunks']} trechos, {stats['mean_ms']:.1f} ms em média (p95 {stats['p95_ms']:.1f} ms), "
+                  f"{stats['fallback_calls']} consultas ao reconhecedor offline")
+        # Sai da etapa atual: para o microfone ou o worker do rosto (e libera a câmera)
+        self.auth.post('close')
+        self.auth.process()
+        # Só no encerramento vale esperar: o fim da gravação da tentativa atual
+        self.face_worker.join(2.0)
         self.root.destroy()
 
 if __name__ == "__main__":
+    startup = StartupReport()
     root = tk.Tk()
-    app = AssistenteGUI(root)
+    app = AssistenteGUI(root, startup)
     root.mainloop()
@@ -0,0 +1,191 @@
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+try:
+    import winsound
+except ImportError:
+    winsound = None
+
+# --- Prioridades das Falas ---
+PRIORITY_HIGH = 0 # Respostas da autenticação
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2 # Pré-síntese das frases fixas
+
+# --- Fila de Fala em uma Única Thread ---
+
+class _Utterance:
+    def __init__(self, text, priority, key, max_age, seq):
+        self.text = text
+        self.priority = priority
+        self.key = key
+        self.max_age = max_age
+        self.seq = seq
+        self.created = time.perf_counter()
+        self.cancelled = False
+        self.synthesize_only = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class SpeechWorker:
+    """Uma única thread dona do motor pyttsx3, alimentada por uma fila de prioridade.
+
+    - say() nunca bloqueia a interface: só coloca a fala na fila.
+    - Textos iguais ainda na fila são unidos (fica a maior prioridade).
+    - Falas com a mesma `key` substituem as pendentes (ex.: a etapa do login
+      mudou e o aviso anterior ficou velho); `max_age` descarta a fala se
+      ela esperou demais; cancel() esvazia a fila.
+    - Frases fixas (cached_phrases) são sintetizadas uma vez para WAV em
+      `cache_dir` e depois só tocadas, quando há um tocador (winsound).
+
+    stats() retorna a espera na fila e a latência total de cada fala.
+    """
+
+    def __init__(self, voice_index=0, cached_phrases=(), cache_dir='./tts_cache/'):
+        self.voice_index = voice_index
+        self.cache_dir = cache_dir
+        self._queue = []
+        self._pending = {}  # texto -> fala na fila
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._cached = {}  # texto -> arquivo WAV já sintetizado
+        self.spoken = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.cache_hits = 0
+        # Últimas 1000 falas, para as latências
+        self._waits = deque(maxlen=1000)
+        self._latencies = deque(maxlen=1000)
+        self._thread = threading.Thread(target=self._run, name='speech', daemon=True)
+        self._thread.start()
+        if winsound is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            for text in cached_phrases:
+                self._push(text, PRIORITY_LOW, None, None, synthesize_only=True)
+
+    def say(self, text, priority=PRIORITY_NORMAL, key=None, max_age=None):
+        """Enfileira uma fala e retorna imediatamente."""
+        self._push(text, priority, key, max_age)
+
+    def _push(self, text, priority, key, max_age, synthesize_only=False):
+        with self._condition:
+            if self._closed:
+                return
+            pending = self._pending.get(text)
+            if pending is not None and not pending.synthesize_only:
+                # Mesma frase já na fila: só promove a prioridade
+                self.coalesced += 1
+                if priority < pending.priority:
+                    pending.cancelled = True
+                    self._discard(pending)
+                else:
+                    return
+            if key is not None:
+                for old in self._pending.values():
+                    if old.key == key and not old.cancelled:
+                        old.cancelled = True
+                        self.cancelled += 1
+                self._pending = {t: u for t, u in self._pending.items() if not u.cancelled}
+            utterance = _Utterance(text, priority, key, max_age, next(self._seq))
+            utterance.synthesize_only = synthesize_only
+            heapq.heappush(self._queue, utterance)
+            self._pending[text] = utterance
+            self._condition.notify()
+
+    def _discard(self, utterance):
+        if self._pending.get(utterance.text) is utterance:
+            del self._pending[utterance.text]
+
+    def cancel(self):
+        """Descarta todas as falas ainda não iniciadas."""
+        with self._condition:
+            for utterance in self._queue:
+                if not utterance.cancelled and not utterance.synthesize_only:
+                    utterance.cancelled = True
+                    self.cancelled += 1
+            self._pending = {t: u for t, u in self._pending.items() if not u.cancelled}
+
+    def close(self, timeout=2.0):
+        """Encerra a thread depois da fala atual (as pendentes são descartadas)."""
+        self.cancel()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout)
+
+    def _next(self):
+        with self._condition:
+            while True:
+                while self._queue and self._queue[0].cancelled:
+                    heapq.heappop(self._queue)
+                if self._queue or self._closed:
+                    break
+                self._condition.wait()
+            if self._closed:
+                return None
+            utterance = heapq.heappop(self._queue)
+            self._discard(utterance)
+            return utterance
+
+    def _cache_path(self, text):
+        digest = hashlib.sha1(f"{self.voice_index}:{text}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.wav")
+
+    def _run(self):
+        # O pyttsx3 precisa ser criado e usado na mesma thread; importado aqui para não
+        # atrasar a abertura da janela
+        import pyttsx3
+        engine = pyttsx3.init()
+        voices = engine.getProperty('voices')
+        if voices:
+            engine.setProperty('voice', voices[min(self.voice_index, len(voices) - 1)].id)
+
+        while True:
+            utterance = self._next()
+            if utterance is None:
+                break
+            if utterance.synthesize_only:
+                path = self._cache_path(utterance.text)
+                if not os.path.exists(path):
+                    engine.save_to_file(utterance.text, path)
+                    engine.runAndWait()
+                if os.path.exists(path):
+                    self._cached[utterance.text] = path
+                continue
+
+            started = time.perf_counter()
+            if utterance.max_age is not None and started - utterance.created > utterance.max_age:
+                self.cancelled += 1
+                continue
+            path = self._cached.get(utterance.text)
+            if path is not None:
+                self.cache_hits += 1
+                winsound.PlaySound(path, winsound.SND_FILENAME)
+            else:
+                engine.say(utterance.text)
+                engine.runAndWait()
+            self.spoken += 1
+            self._waits.append(started - utterance.created)
+            self._latencies.append(time.perf_counter() - utterance.created)
+
+    def stats(self):
+        """Contadores e latências (s): espera na fila e do pedido até o fim da fala."""
+        def summary(values):
+            if not values:
+                return {'mean': 0.0, 'max': 0.0}
+            return {'mean': sum(values) / len(values), 'max': max(values)}
+
+        return {
+            'spoken': self.spoken,
+            'coalesced': self.coalesced,
+            'cancelled': self.cancelled,
+            'cache_hits': self.cache_hits,
+            'queue_wait': summary(self._waits),
+            'latency': summary(self._latencies),
+        }